@@ -0,0 +1,177 @@
+# ./analytics.py
+import asyncio
+import time
+import uuid
+from array import array
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.dialects.postgresql import insert
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+EMPTY = -1
+# rows kept for the next flush while the database is unreachable
+MAX_PENDING_ROWS = 100_000
+
+# pids repeat across container restarts, so each process picks its own id
+WORKER_ID = uuid.uuid4().hex
+
+
+class StreamRollup:
+    # per-minute buckets in fixed-size rings, slot = minute % size; a slot is
+    # handed to the flusher once its minute has closed and then reused
+    __slots__ = (
+        "minutes", "peak_viewers", "viewer_seconds", "messages", "unique_chatters",
+        "chatters", "chatters_minute", "viewers", "updated",
+    )
+
+    def __init__(self, size: int, now: float):
+        self.minutes = array("q", [EMPTY] * size)
+        self.peak_viewers = array("l", [0] * size)
+        self.viewer_seconds = array("d", [0.0] * size)
+        self.messages = array("l", [0] * size)
+        self.unique_chatters = array("l", [0] * size)
+        self.chatters: set[int] = set()
+        self.chatters_minute = EMPTY
+        self.viewers = 0
+        self.updated = now
+
+    def slot(self, minute: int) -> int:
+        index = minute % len(self.minutes)
+        if self.minutes[index] != minute:
+            self.minutes[index] = minute
+            self.peak_viewers[index] = self.viewers
+            self.viewer_seconds[index] = 0.0
+            self.messages[index] = 0
+            self.unique_chatters[index] = 0
+        return index
+
+    def advance(self, now: float):
+        # spread the current viewer count over every minute it was held for
+        if not self.viewers:
+            self.updated = max(self.updated, now)
+            return
+        while self.updated < now:
+            minute = int(self.updated // 60)
+            end = min(now, (minute + 1) * 60)
+            index = self.slot(minute)
+            self.viewer_seconds[index] += self.viewers * (end - self.updated)
+            self.updated = end
+
+    def set_viewers(self, count: int, now: float):
+        self.advance(now)
+        self.viewers = count
+        index = self.slot(int(now // 60))
+        self.peak_viewers[index] = max(self.peak_viewers[index], count)
+
+    def add_message(self, user_id: int, now: float):
+        self.advance(now)
+        minute = int(now // 60)
+        if minute != self.chatters_minute:
+            self.chatters.clear()
+            self.chatters_minute = minute
+        self.chatters.add(user_id)
+
+        index = self.slot(minute)
+        self.messages[index] += 1
+        self.unique_chatters[index] = len(self.chatters)
+
+    def drain(self, stream_id: int, now: float, include_current: bool) -> list[dict]:
+        self.advance(now)
+        current = int(now // 60)
+        rows = []
+        for index, minute in enumerate(self.minutes):
+            if minute == EMPTY or (minute >= current and not include_current):
+                continue
+            rows.append({
+                "stream_id": stream_id,
+                "minute": datetime.fromtimestamp(minute * 60, timezone.utc),
+                "worker": WORKER_ID,
+                "peak_viewers": self.peak_viewers[index],
+                "viewer_seconds": self.viewer_seconds[index],
+                "messages": self.messages[index],
+                "unique_chatters": self.unique_chatters[index],
+            })
+            self.minutes[index] = EMPTY
+        return rows
+
+    def idle(self) -> bool:
+        return not self.viewers and all(minute == EMPTY for minute in self.minutes)
+
+
+class AnalyticsCollector:
+    def __init__(self, ring_minutes: int):
+        self.ring_minutes = ring_minutes
+        self.streams: dict[int, StreamRollup] = {}
+        self.pending: list[dict] = []
+
+    def rollup(self, stream_id: int, now: float) -> StreamRollup:
+        rollup = self.streams.get(stream_id)
+        if rollup is None:
+            rollup = self.streams[stream_id] = StreamRollup(self.ring_minutes, now)
+        return rollup
+
+    def record_viewers(self, stream_id: int, count: int, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.rollup(stream_id, now).set_viewers(count, now)
+
+    def record_message(self, stream_id: int, user_id: int, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.rollup(stream_id, now).add_message(user_id, now)
+
+    def drain(self, now: Optional[float] = None, include_current: bool = False) -> list[dict]:
+        now = time.time() if now is None else now
+        rows, self.pending = self.pending, []
+        for stream_id, rollup in list(self.streams.items()):
+            rows.extend(rollup.drain(stream_id, now, include_current))
+            if rollup.idle():
+                del self.streams[stream_id]
+        return rows
+
+    def restore(self, rows: list[dict]):
+        # a worker writes each of its minutes once, so retrying is safe
+        self.pending = rows[-MAX_PENDING_ROWS:] + self.pending
+        if len(rows) > MAX_PENDING_ROWS:
+            print(f"Analytics dropped {len(rows) - MAX_PENDING_ROWS} rows while the database was unreachable")
+
+
+def write_rollups(rows: list[dict]):
+    if not rows:
+        return
+
+    # a row holds one worker's complete minute, so a retried write after a
+    # failure that did reach the database overwrites rather than adds
+    stats = models.StreamMinuteStats.__table__
+    statement = insert(stats)
+    statement = statement.on_conflict_do_update(
+        index_elements=[stats.c.stream_id, stats.c.minute, stats.c.worker],
+        set_={
+            "peak_viewers": statement.excluded.peak_viewers,
+            "viewer_seconds": statement.excluded.viewer_seconds,
+            "messages": statement.excluded.messages,
+            "unique_chatters": statement.excluded.unique_chatters,
+        }
+    )
+    with SessionLocal() as db:
+        db.execute(statement, rows)
+        db.commit()
+
+
+async def flush(include_current: bool = False):
+    rows = collector.drain(include_current=include_current)
+    try:
+        await run_in_threadpool(write_rollups, rows)
+    except Exception as e:
+        print(f"Analytics flush of {len(rows)} rows failed: {e}")
+        collector.restore(rows)
+
+
+async def run_flusher():
+    while True:
+        await asyncio.sleep(settings.analytics_flush_seconds)
+        await flush()
+
+
+collector = AnalyticsCollector(settings.analytics_ring_minutes)
@@ -0,0 +1,86 @@
+# ./batching.py
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+
+class MessageRate:
+    __slots__ = ("window_start", "count", "rate", "batching")
+
+    def __init__(self, now: float):
+        self.window_start = now
+        self.count = 0
+        self.rate = 0.0
+        self.batching = False
+
+
+class ChatBatcher:
+    def __init__(
+        self,
+        send: Callable[[int, dict], Awaitable[None]],
+        window_ms: int,
+        threshold: float,
+        rate_window: float = 1.0
+    ):
+        self.send = send
+        self.window = window_ms / 1000
+        self.threshold = threshold
+        self.rate_window = rate_window
+        self.rates: dict[int, MessageRate] = {}
+        self.pending: dict[int, list[dict]] = {}
+        # the loop only keeps weak references to tasks
+        self.flushes: set[asyncio.Task] = set()
+        self.frames_sent = 0
+        self.messages_batched = 0
+
+    def _update_rate(self, stream_id: int, now: float) -> MessageRate:
+        rate = self.rates.get(stream_id)
+        if rate is None:
+            rate = self.rates[stream_id] = MessageRate(now)
+        rate.count += 1
+
+        elapsed = now - rate.window_start
+        if elapsed >= self.rate_window:
+            rate.rate = rate.count / elapsed
+            rate.count = 0
+            rate.window_start = now
+            # hysteresis so a channel hovering at the threshold does not flap
+            if rate.rate >= self.threshold:
+                rate.batching = True
+            elif rate.rate < self.threshold / 2:
+                rate.batching = False
+        return rate
+
+    async def publish(self, stream_id: int, message: dict):
+        rate = self._update_rate(stream_id, time.monotonic())
+
+        pending = self.pending.get(stream_id)
+        if pending is not None:
+            pending.append(message)
+            return
+
+        if not rate.batching:
+            self.frames_sent += 1
+            await self.send(stream_id, message)
+            return
+
+        self.pending[stream_id] = [message]
+        task = asyncio.get_running_loop().create_task(self._flush_later(stream_id))
+        self.flushes.add(task)
+        task.add_done_callback(self.flushes.discard)
+
+    async def _flush_later(self, stream_id: int):
+        await asyncio.sleep(self.window)
+        messages = self.pending.pop(stream_id, None)
+        if not messages:
+            return
+
+        self.frames_sent += 1
+        self.messages_batched += len(messages)
+        await self.send(stream_id, {
+            "type": "chat_batch",
+            "data": [message["data"] for message in messages]
+        })
+
+    def forget(self, stream_id: int):
+        self.rates.pop(stream_id, None)
@@ -1,14 +1,64 @@
 # config.py
 import os
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str
+    read_replica_url: Optional[str] = None
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     frontend_url: str
+    ws_heartbeat_interval_seconds: int = 25
+    ws_idle_timeout_seconds: int = 75
+    chat_user_rate: float = 1.0
+    chat_user_burst: float = 5.0
+    chat_stream_rate: float = 50.0
+    chat_stream_burst: float = 100.0
+    chat_slow_mode_refresh_seconds: float = 5
+    chat_batch_window_ms: int = 75
+    chat_batch_threshold: float = 20.0
+    chat_replay_buffer_size: int = 500
+    chat_replay_db_limit: int = 500
+    chat_reconnect_min_ms: int = 1000
+    chat_reconnect_max_ms: int = 15000
+    multiplex_max_topics: int = 100
+    chat_search_batch_size: int = 5000
+    chat_search_interval_seconds: float = 5
+    chat_replay_window_seconds: int = 30
+    bulk_delete_threshold: int = 10000
+    analytics_ring_minutes: int = 10
+    notification_batch_size: int = 1000
+    notification_reconnect_seconds: float = 5
+    sql_profiler_enabled: bool = False
+    sql_slow_query_ms: float = 100
+    sql_n_plus_one_threshold: int = 5
+    trending_half_life_seconds: float = 300
+    trending_refresh_seconds: float = 5
+    trending_max_k: int = 100
+    trending_sync_seconds: float = 10
+    trending_viewer_weight: float = 1.0
+    trending_growth_weight: float = 2.0
+    trending_chat_weight: float = 3.0
+    trending_follower_weight: float = 5.0
+    analytics_flush_seconds: float = 60
+    bulk_delete_chunk_size: int = 5000
+    chat_partition_days: int = 7
+    chat_partitions_ahead: int = 2
+    chat_retention_days: int = 90
+    chat_retention_interval_seconds: float = 3600
+    chat_archive_dir: str = "archives/chats"
+    chat_archive_zstd_level: int = 10
+    chat_archive_chunk_size: int = 5000
+    replica_max_lag_seconds: float = 5
+    replica_lag_check_seconds: float = 2
+    mock_api_enabled: bool = False
+    scalar_docs_enabled: bool = False
+    emote_cache_path: str = "emotes.json"
+    emote_reload_seconds: float = 300
+    global_blocked_terms_path: Optional[str] = None
 
     # class Config:
     #     env_file = Path(".env")
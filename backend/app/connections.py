@@ -0,0 +1,107 @@
+# ./connections.py
+from typing import Iterable, Optional, Union
+from fastapi import WebSocket
+from app.framing import JSON
+
+
+class Connection:
+    __slots__ = ("websocket", "stream_id", "user_id", "encoding", "last_seen", "slot")
+
+    def __init__(self, websocket: WebSocket, stream_id: int, user_id: Optional[int], encoding: str = JSON):
+        self.websocket = websocket
+        self.stream_id = stream_id
+        self.user_id = user_id
+        self.encoding = encoding
+        self.last_seen = 0.0
+        self.slot: Optional[int] = None
+
+
+class ConnectionRegistry:
+    def __init__(self):
+        self.connections: dict[WebSocket, Connection] = {}
+        self.by_stream: dict[int, set[Connection]] = {}
+        # most users hold one socket per stream, so a bare record is stored
+        # until a second one arrives
+        self.by_user: dict[tuple[int, Optional[int]], Union[Connection, set[Connection]]] = {}
+        self.stream_owners: dict[int, int] = {}
+        self.streamer_streams: dict[int, set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.connections)
+
+    def add(
+        self,
+        websocket: WebSocket,
+        stream_id: int,
+        user_id: Optional[int],
+        streamer_id: Optional[int] = None,
+        encoding: str = JSON
+    ) -> Connection:
+        connection = Connection(websocket, stream_id, user_id, encoding)
+        self.connections[websocket] = connection
+
+        stream_connections = self.by_stream.get(stream_id)
+        if stream_connections is None:
+            stream_connections = self.by_stream[stream_id] = set()
+            if streamer_id is not None:
+                self.stream_owners[stream_id] = streamer_id
+                self.streamer_streams.setdefault(streamer_id, set()).add(stream_id)
+        stream_connections.add(connection)
+
+        key = (stream_id, user_id)
+        existing = self.by_user.get(key)
+        if existing is None:
+            self.by_user[key] = connection
+        elif isinstance(existing, Connection):
+            self.by_user[key] = {existing, connection}
+        else:
+            existing.add(connection)
+        return connection
+
+    def remove(self, websocket: WebSocket) -> Optional[Connection]:
+        connection = self.connections.pop(websocket, None)
+        if connection is None:
+            return None
+
+        stream_id = connection.stream_id
+        stream_connections = self.by_stream[stream_id]
+        stream_connections.discard(connection)
+        if not stream_connections:
+            del self.by_stream[stream_id]
+            streamer_id = self.stream_owners.pop(stream_id, None)
+            if streamer_id is not None:
+                streams = self.streamer_streams[streamer_id]
+                streams.discard(stream_id)
+                if not streams:
+                    del self.streamer_streams[streamer_id]
+
+        key = (stream_id, connection.user_id)
+        user_connections = self.by_user[key]
+        if isinstance(user_connections, Connection):
+            del self.by_user[key]
+        else:
+            user_connections.discard(connection)
+            if len(user_connections) == 1:
+                self.by_user[key] = user_connections.pop()
+
+        return connection
+
+    def get(self, websocket: WebSocket) -> Optional[Connection]:
+        return self.connections.get(websocket)
+
+    def stream(self, stream_id: int) -> list[Connection]:
+        return list(self.by_stream.get(stream_id, ()))
+
+    def stream_count(self, stream_id: int) -> int:
+        return len(self.by_stream.get(stream_id, ()))
+
+    def user(self, stream_id: int, user_id: Optional[int]) -> list[Connection]:
+        user_connections = self.by_user.get((stream_id, user_id))
+        if user_connections is None:
+            return []
+        if isinstance(user_connections, Connection):
+            return [user_connections]
+        return list(user_connections)
+
+    def streams_of(self, streamer_id: int) -> Iterable[int]:
+        return list(self.streamer_streams.get(streamer_id, ()))
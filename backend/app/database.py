@@ -1,15 +1,111 @@
 # ./database.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import threading
+import time
+from typing import Optional
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.config import settings
+from app.metrics import DB_POOL_WAIT_SECONDS, registry
 
 POSTGRES_URL = settings.database_url
 
-engine = create_engine(POSTGRES_URL)
+
+class TimedQueuePool(QueuePool):
+    # _do_get is where a checkout blocks when every connection is in use
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+engine = create_engine(POSTGRES_URL, poolclass=TimedQueuePool)
+# optional streaming replica for reads that can be a few seconds stale
+read_engine = (
+    create_engine(
+        settings.read_replica_url,
+        poolclass=TimedQueuePool,
+        pool_pre_ping=True,
+        connect_args={"connect_timeout": 2}
+    )
+    if settings.read_replica_url
+    else None
+)
+
+# zero on a standby that is streaming and has replayed all it received (or
+# a server that is not one), NULL when it has not replayed anything yet. A
+# standby that lost its primary has replayed all it received too, so it is
+# only caught up while its WAL receiver is streaming.
+REPLICA_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+            AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+class ReplicaMonitor:
+    # lag is sampled at most every check_seconds by whichever request needs
+    # it while the others use the last sample; a replica that lags or cannot
+    # be reached sends reads to the primary until a later sample clears it
+    def __init__(self, engine: Engine, max_lag_seconds: float, check_seconds: float):
+        self.engine = engine
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+        self.lock = threading.Lock()
+
+    def measure(self) -> Optional[float]:
+        try:
+            with self.engine.connect() as conn:
+                lag = conn.execute(REPLICA_LAG).scalar()
+        except Exception as e:
+            print(f"Read replica lag check failed: {e}")
+            return None
+        return float(lag) if lag is not None else None
+
+    def usable(self) -> bool:
+        if time.monotonic() - self.checked_at >= self.check_seconds and self.lock.acquire(blocking=False):
+            try:
+                self.lag = self.measure()
+                self.checked_at = time.monotonic()
+            finally:
+                self.lock.release()
+
+        if self.lag is None or self.lag > self.max_lag_seconds:
+            DB_REPLICA_FALLBACKS.inc()
+            return False
+        return True
+
+
+replica = (
+    ReplicaMonitor(read_engine, settings.replica_max_lag_seconds, settings.replica_lag_check_seconds)
+    if read_engine is not None
+    else None
+)
+
+registry.gauge_func(
+    "db_pool_checked_out", "Pooled database connections currently in use.", (),
+    lambda: {(): engine.pool.checkedout()}
+)
+DB_REPLICA_FALLBACKS = registry.counter(
+    "db_replica_fallback_reads_total", "Replica reads sent to the primary because the replica lagged or was down."
+)
+registry.gauge_func(
+    "db_replica_lag_seconds", "Read replica lag as last sampled.", (),
+    lambda: {(): replica.lag} if replica is not None and replica.lag is not None else {}
+)
 
 Base = declarative_base()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine or engine)
 
 def get_db():
     db = SessionLocal()
@@ -17,3 +113,17 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def read_session() -> Session:
+    if replica is not None and replica.usable():
+        return ReadSessionLocal()
+    return SessionLocal()
+
+def get_read_db():
+    # for safe-to-lag reads only; anything that must see the caller's own
+    # writes stays on get_db
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,146 @@
+# ./deletion.py
+# python -m app.deletion   -> finish jobs left pending or running by a restarted worker
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.orm import Session
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.routes.upload import delete_old_file
+
+USER = "user"
+STREAM = "stream"
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _stream_ids(target_type: str, target_id: int):
+    if target_type == STREAM:
+        return [target_id]
+    return select(models.Stream.id).where(models.Stream.user_id == target_id).scalar_subquery()
+
+
+def _dependents(target_type: str, target_id: int) -> list:
+    stream_ids = _stream_ids(target_type, target_id)
+    dependents = [
+        (models.Chat, models.Chat.stream_id.in_(stream_ids)),
+        (models.StreamViewer, models.StreamViewer.stream_id.in_(stream_ids)),
+        (models.ChatReplayWindow, models.ChatReplayWindow.stream_id.in_(stream_ids)),
+    ]
+    if target_type == USER:
+        dependents += [
+            (models.Chat, models.Chat.user_id == target_id),
+            (models.StreamViewer, models.StreamViewer.user_id == target_id),
+            (models.Follow, or_(models.Follow.follower_id == target_id, models.Follow.followed_id == target_id)),
+        ]
+    return dependents
+
+
+def is_large(db: Session, target_type: str, target_id: int) -> bool:
+    threshold = settings.bulk_delete_threshold
+    for model, condition in _dependents(target_type, target_id):
+        key = list(model.__table__.primary_key.columns)[0]
+        if db.query(key).filter(condition).limit(threshold + 1).count() > threshold:
+            return True
+    return False
+
+
+def _target(db: Session, target_type: str, target_id: int):
+    model = models.User if target_type == USER else models.Stream
+    return db.query(model).filter(model.id == target_id).first()
+
+
+def _files(db: Session, target_type: str, target_id: int) -> list[str]:
+    target = _target(db, target_type, target_id)
+    if target is None:
+        return []
+
+    streams = [target] if target_type == STREAM else target.streams
+    files = [stream.thumbnail for stream in streams if stream.thumbnail]
+    if target_type == USER and target.profile_picture:
+        files.append(target.profile_picture)
+    return files
+
+
+def delete_now(db: Session, target_type: str, target_id: int):
+    files = _files(db, target_type, target_id)
+    target = _target(db, target_type, target_id)
+    db.delete(target)
+    db.commit()
+    for path in files:
+        delete_old_file(path)
+
+
+def create_job(db: Session, target_type: str, target_id: int) -> models.DeletionJob:
+    job = models.DeletionJob(id=uuid.uuid4().hex, target_type=target_type, target_id=target_id, status=PENDING)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _delete_chunk(db: Session, model, condition) -> int:
+    # partitioned chats have a composite key, so match on every key column
+    key = tuple_(*model.__table__.primary_key.columns)
+    chunk = select(*model.__table__.primary_key.columns).where(condition).limit(settings.bulk_delete_chunk_size)
+    return db.query(model).filter(key.in_(chunk)).delete(synchronize_session=False)
+
+
+def run_job(job_id: str):
+    with SessionLocal() as db:
+        job = db.query(models.DeletionJob).filter(models.DeletionJob.id == job_id).first()
+        if job is None or job.status == DONE:
+            return
+
+        job.status = RUNNING
+        db.commit()
+
+        try:
+            files = _files(db, job.target_type, job.target_id)
+
+            # each chunk commits together with the progress it made, so a
+            # restarted job picks up where the last one stopped
+            for model, condition in _dependents(job.target_type, job.target_id):
+                while True:
+                    deleted = _delete_chunk(db, model, condition)
+                    job.deleted_rows += deleted
+                    db.commit()
+                    if deleted < settings.bulk_delete_chunk_size:
+                        break
+
+            target = _target(db, job.target_type, job.target_id)
+            if target is not None:
+                db.delete(target)
+            job.status = DONE
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            job.status = FAILED
+            job.error = str(e)
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            print(f"Deletion job {job_id} failed: {e}")
+            return
+
+    for path in files:
+        delete_old_file(path)
+
+
+def resume_jobs():
+    with SessionLocal() as db:
+        job_ids = [
+            job_id for job_id, in db.query(models.DeletionJob.id)
+            .filter(models.DeletionJob.status.in_([PENDING, RUNNING]))
+            .order_by(models.DeletionJob.created_at.asc())
+        ]
+    for job_id in job_ids:
+        run_job(job_id)
+
+
+if __name__ == "__main__":
+    resume_jobs()
@@ -0,0 +1,173 @@
+# ./emotes.py
+# python -m app.emotes refresh   -> fetch third-party sets into the local cache file
+# Workers read the cache file, building it from the third-party sets when it
+# is missing, and re-read it every EMOTE_RELOAD_SECONDS, so a refresh is
+# picked up without a restart.
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import urllib.request
+from typing import Optional, Protocol
+from fastapi.concurrency import run_in_threadpool
+from app.config import settings
+
+TOKEN_PATTERN = re.compile(r"\S+")
+
+THIRD_PARTY_SETS = [
+    "https://api.betterttv.net/3/cached/emotes/global",
+    "https://api.frankerfacez.com/v1/set/global",
+    "https://api.7tv.app/v3/emote-sets/01G0X6HFX8000EH87BCAZW2PPP",
+    "https://api.7tv.app/v3/emote-sets/01F6197X28000B6V3DJP9R671R",
+    "https://api.7tv.app/v3/emote-sets/01GW8MRR8R0000XWTYFAW9XRTZ",
+]
+
+
+def _utf16_len(text: str) -> int:
+    return len(text.encode("utf-16-le")) // 2
+
+
+class EmoteProvider(Protocol):
+    def fetch(self) -> dict[str, str]:
+        ...
+
+
+class FileEmoteProvider:
+    def __init__(self, path: str, fallback: Optional[EmoteProvider] = None):
+        self.path = path
+        self.fallback = fallback
+
+    def fetch(self) -> dict[str, str]:
+        if not os.path.exists(self.path):
+            if self.fallback is None:
+                return {}
+            emotes = self.fallback.fetch()
+            if emotes:
+                try:
+                    write_cache_file(EmoteCatalog(emotes), self.path)
+                except OSError as e:
+                    print(f"Failed to write emote cache {self.path}: {e}")
+            return emotes
+        with open(self.path) as f:
+            return json.load(f)["emotes"]
+
+
+class ThirdPartyEmoteProvider:
+    def __init__(self, urls: list[str] = THIRD_PARTY_SETS, timeout: float = 10):
+        self.urls = urls
+        self.timeout = timeout
+
+    def _get(self, url: str):
+        request = urllib.request.Request(url, headers={"User-Agent": "stream_sh"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def fetch(self) -> dict[str, str]:
+        emotes: dict[str, str] = {}
+        for url in self.urls:
+            try:
+                data = self._get(url)
+            except Exception as e:
+                print(f"Failed to load emotes from {url}: {e}")
+                continue
+
+            if "betterttv" in url:
+                for e in data:
+                    emotes[e["code"]] = f"https://cdn.betterttv.net/emote/{e['id']}/1x"
+            elif "frankerfacez" in url:
+                for emote_set in data["sets"].values():
+                    for e in emote_set["emoticons"]:
+                        emotes[e["name"]] = e["urls"].get("1") or e["urls"].get("2")
+            elif "7tv" in url:
+                for e in data["emotes"]:
+                    emotes[e["name"]] = f"https:{e['data']['host']['url']}/{e['data']['host']['files'][0]['name']}"
+        return emotes
+
+
+class EmoteCatalog:
+    def __init__(self, emotes: dict[str, str]):
+        self.emotes = emotes
+        self.names = frozenset(emotes)
+        body = json.dumps(emotes, sort_keys=True, separators=(",", ":"))
+        self.version = hashlib.sha1(body.encode()).hexdigest()[:16]
+        self.etag = f'"{self.version}"'
+        self.payload = f'{{"version":"{self.version}","emotes":{body}}}'.encode()
+
+    def tokenize(self, message: str) -> list[tuple[int, int]]:
+        names = self.names
+        if not names:
+            return []
+        spans = [match.span() for match in TOKEN_PATTERN.finditer(message) if match.group() in names]
+        if not spans or message.isascii():
+            return spans
+        # clients slice with UTF-16 offsets
+        return [(_utf16_len(message[:start]), _utf16_len(message[:end])) for start, end in spans]
+
+
+EMPTY_CATALOG = EmoteCatalog({})
+
+_provider: EmoteProvider = FileEmoteProvider(settings.emote_cache_path, fallback=ThirdPartyEmoteProvider())
+_catalog: Optional[EmoteCatalog] = None
+_load_lock = threading.Lock()
+
+
+def set_provider(provider: EmoteProvider):
+    global _provider, _catalog
+    _provider = provider
+    _catalog = None
+
+
+def get_catalog() -> EmoteCatalog:
+    # may fetch over the network on first use, so not for the event loop
+    global _catalog
+    if _catalog is None:
+        with _load_lock:
+            if _catalog is None:
+                _catalog = EmoteCatalog(_provider.fetch())
+    return _catalog
+
+
+def current_catalog() -> EmoteCatalog:
+    # never loads: empty until the reloader's first load has finished
+    return _catalog if _catalog is not None else EMPTY_CATALOG
+
+
+def reload_catalog() -> EmoteCatalog:
+    global _catalog
+    with _load_lock:
+        _catalog = EmoteCatalog(_provider.fetch())
+    return _catalog
+
+
+async def run_reloader():
+    while True:
+        try:
+            await run_in_threadpool(reload_catalog)
+        except Exception as e:
+            print(f"Emote reload failed: {e}")
+        await asyncio.sleep(settings.emote_reload_seconds)
+
+
+def write_cache_file(catalog: EmoteCatalog, path: str):
+    # written aside and renamed so a worker never reads half a file
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(catalog.payload)
+    os.replace(temp_path, path)
+
+
+def refresh_cache_file(path: str = settings.emote_cache_path) -> EmoteCatalog:
+    catalog = EmoteCatalog(ThirdPartyEmoteProvider().fetch())
+    write_cache_file(catalog, path)
+    return catalog
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["refresh"]:
+        catalog = refresh_cache_file()
+        print(f"Wrote {len(catalog.emotes)} emotes (version {catalog.version}) to {settings.emote_cache_path}")
+    else:
+        print("usage: python -m app.emotes refresh")
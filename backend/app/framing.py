@@ -0,0 +1,112 @@
+# ./framing.py
+# Clients choose how frames are encoded with the "encoding" query param on the socket URL:
+#   json     text frames (default, and the fallback for anything unknown)
+#   deflate  binary frames holding raw-deflated JSON, each frame compressed on its own
+#   msgpack  binary MessagePack frames (only offered when msgpack is installed)
+import json
+import zlib
+from typing import Optional, Union
+from fastapi import WebSocket, WebSocketDisconnect
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+DEFLATE = "deflate"
+MSGPACK = "msgpack"
+
+# chat frames are a few hundred bytes, so a 4 KiB window loses almost nothing
+# against the default 32 KiB while keeping the compressor allocation small
+DEFLATE_WBITS = -12
+DEFLATE_LEVEL = 6
+DEFLATE_MEMLEVEL = 5
+
+# client frames are chat messages and (un)subscribe requests; anything that
+# inflates past this is refused rather than decompressed in full
+MAX_DECODED = 64 * 1024
+MESSAGE_TOO_BIG = 1009
+
+ENCODINGS = {JSON, DEFLATE} | ({MSGPACK} if msgpack is not None else set())
+
+
+class FrameTooLarge(ValueError):
+    pass
+
+
+def negotiate(requested: Optional[str]) -> str:
+    if requested in ENCODINGS:
+        return requested
+    return JSON
+
+
+def deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, DEFLATE_WBITS, DEFLATE_MEMLEVEL)
+    return compressor.compress(data) + compressor.flush()
+
+
+def inflate(payload: bytes) -> bytes:
+    decompressor = zlib.decompressobj(DEFLATE_WBITS)
+    data = decompressor.decompress(payload, MAX_DECODED + 1)
+    if decompressor.unconsumed_tail or len(data) > MAX_DECODED:
+        raise FrameTooLarge()
+    return data
+
+
+def encode(message: dict, encoding: str) -> Union[str, bytes]:
+    if encoding == MSGPACK:
+        return msgpack.packb(message)
+    text = json.dumps(message, separators=(",", ":"))
+    if encoding == DEFLATE:
+        return deflate(text.encode())
+    return text
+
+
+def decode(payload: Union[str, bytes], encoding: str) -> dict:
+    if isinstance(payload, str):
+        return json.loads(payload)
+    if encoding == MSGPACK:
+        return msgpack.unpackb(payload)
+    if encoding == DEFLATE:
+        return json.loads(inflate(payload))
+    return json.loads(payload)
+
+
+class FrameCache:
+    # one broadcast, encoded at most once per encoding in use
+    __slots__ = ("message", "frames")
+
+    def __init__(self, message: dict):
+        self.message = message
+        self.frames: dict[str, Union[str, bytes]] = {}
+
+    def get(self, encoding: str) -> Union[str, bytes]:
+        frame = self.frames.get(encoding)
+        if frame is None:
+            frame = self.frames[encoding] = encode(self.message, encoding)
+        return frame
+
+
+async def send_frame(websocket: WebSocket, frame: Union[str, bytes]):
+    if isinstance(frame, str):
+        await websocket.send_text(frame)
+    else:
+        await websocket.send_bytes(frame)
+
+
+async def send(websocket: WebSocket, message: dict, encoding: str):
+    await send_frame(websocket, encode(message, encoding))
+
+
+async def receive(websocket: WebSocket, encoding: str) -> dict:
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    try:
+        if message.get("text") is not None:
+            return decode(message["text"], encoding)
+        return decode(message["bytes"], encoding)
+    except FrameTooLarge:
+        await websocket.close(code=MESSAGE_TOO_BIG)
+        raise WebSocketDisconnect(MESSAGE_TOO_BIG)
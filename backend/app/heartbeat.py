@@ -0,0 +1,126 @@
+# ./heartbeat.py
+import asyncio
+import math
+import time
+from typing import Optional
+from app.config import settings
+from app.connections import Connection
+from app.framing import FrameCache, send_frame
+from app.metrics import registry as metrics
+
+PING_FRAME = FrameCache({"type": "ping"})
+UNTRACKED = -1
+
+
+class HeartbeatMonitor:
+    def __init__(self, interval: float, timeout: float, tick: float = 1.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.tick = tick
+        # one slot per tick, enough to hold the longest deadline we schedule
+        self.wheel: list[set[Connection]] = [set() for _ in range(math.ceil(max(interval, timeout) / tick) + 2)]
+        self.position = 0
+        self.task: Optional[asyncio.Task] = None
+        self.sending: set[asyncio.Task] = set()
+        self.evicted: dict[str, int] = {"idle": 0, "send_failed": 0}
+        self.pings_sent = 0
+
+    def __len__(self) -> int:
+        return sum(len(slot) for slot in self.wheel)
+
+    def _schedule(self, connection: Connection, delay: float):
+        if connection.slot == UNTRACKED:
+            return
+        ticks = min(max(1, math.ceil(delay / self.tick)), len(self.wheel) - 1)
+        slot = (self.position + ticks) % len(self.wheel)
+        connection.slot = slot
+        self.wheel[slot].add(connection)
+
+    def track(self, connection: Connection):
+        connection.last_seen = time.monotonic()
+        self._schedule(connection, self.interval)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def untrack(self, connection: Connection):
+        if connection.slot is not None and connection.slot != UNTRACKED:
+            self.wheel[connection.slot].discard(connection)
+        connection.slot = UNTRACKED
+
+    def touch(self, connection: Connection):
+        # rescheduling is lazy: the wheel re-checks last_seen when the slot fires
+        connection.last_seen = time.monotonic()
+
+    async def _evict(self, connection: Connection, reason: str):
+        self.evicted[reason] += 1
+        try:
+            await connection.websocket.close(code=1001)
+        except Exception:
+            pass
+
+    async def _ping(self, connection: Connection, idle: float):
+        try:
+            await asyncio.wait_for(
+                send_frame(connection.websocket, PING_FRAME.get(connection.encoding)),
+                self.interval
+            )
+            self.pings_sent += 1
+        except Exception:
+            await self._evict(connection, "send_failed")
+            return
+        self._schedule(connection, min(self.interval, self.timeout - idle))
+
+    def _check(self, connection: Connection, now: float):
+        idle = now - connection.last_seen
+        if idle < self.interval:
+            self._schedule(connection, self.interval - idle)
+            return
+
+        # sends run as their own tasks so a socket that stalls for the whole
+        # send timeout cannot hold up the rest of the wheel
+        if idle >= self.timeout:
+            send = self._evict(connection, "idle")
+        else:
+            send = self._ping(connection, idle)
+        task = asyncio.get_running_loop().create_task(send)
+        self.sending.add(task)
+        task.add_done_callback(self.sending.discard)
+
+    def _fire(self):
+        due = self.wheel[self.position]
+        if not due:
+            return
+        self.wheel[self.position] = set()
+        now = time.monotonic()
+        for connection in due:
+            connection.slot = None
+        for connection in due:
+            self._check(connection, now)
+
+    async def _run(self):
+        started = time.monotonic()
+        fired = 0
+        while True:
+            await asyncio.sleep(self.tick)
+            # the wheel follows the clock rather than the loop: every slot
+            # whose time has passed fires, however late this wakeup was
+            elapsed = int((time.monotonic() - started) / self.tick)
+            for _ in range(min(elapsed - fired, len(self.wheel))):
+                self.position = (self.position + 1) % len(self.wheel)
+                self._fire()
+            fired = elapsed
+
+
+heartbeat = HeartbeatMonitor(
+    settings.ws_heartbeat_interval_seconds,
+    settings.ws_idle_timeout_seconds
+)
+
+metrics.counter_func(
+    "ws_heartbeat_evictions_total", "Sockets closed by the heartbeat monitor.", ("reason",),
+    lambda: {(reason,): count for reason, count in heartbeat.evicted.items()}
+)
+metrics.counter_func(
+    "ws_heartbeat_pings_total", "Pings sent by the heartbeat monitor.", (),
+    lambda: {(): heartbeat.pings_sent}
+)
@@ -1,49 +1,47 @@
 # ./main.py
-from scalar_fastapi import get_scalar_api_reference
+import asyncio
+import importlib
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import inspect, text
-from app.database import engine
+from app.database import engine, read_engine
 from app.config import settings
-from app import models
-from app.routes import auth, stream, chat, follows, rtmp, upload
-
-from app import faker_api
+from app import analytics, migrations, retention, search, trending
+from app.emotes import run_reloader as run_emote_reloader
+from app.notifications import notifications
+from app.metrics import MetricsMiddleware
+from app.profiler import SQLProfilerMiddleware, profiler
+from app.routes import auth, stream, chat, follows, rtmp, upload, emotes, multiplex, metrics, notifications as notification_routes
 
 app = FastAPI(
     root_path="/api"
 )
 
 @app.on_event("startup")
-async def startup_event():
-    with engine.connect() as conn:
-        result = conn.execute(text("SELECT pg_try_advisory_lock(12345)"))
-        lock_acquired = result.scalar()
-        
-        if lock_acquired:
-            try:
-                inspector = inspect(engine)
-                existing_tables = inspector.get_table_names()
-                
-                if not existing_tables:
-                    print("Creating database tables...")
-                    models.Base.metadata.create_all(engine)
-                    print("Database tables created successfully")
-                else:
-                    print("Database tables already exist")
-            finally:
-                conn.execute(text("SELECT pg_advisory_unlock(12345)"))
-        else:
-            print("Another process is initializing database, waiting...")
-            import time
-            time.sleep(2)
-            inspector = inspect(engine)
-            existing_tables = inspector.get_table_names()
-            if existing_tables:
-                print("Database tables are ready")
-            else:
-                print("Database initialization failed in other process")
+def check_schema_version():
+    # the schema is migrated before the workers start (python -m app.migrations)
+    migrations.check_version()
+
+background_jobs: set[asyncio.Task] = set()
+
+@app.on_event("startup")
+async def start_background_jobs():
+    for job in (
+        search.run_indexer(),
+        retention.run_retention(),
+        analytics.run_flusher(),
+        run_emote_reloader(),
+        trending.run_sync(),
+        notifications.run_listener()
+    ):
+        # held here because the loop only keeps weak references to tasks
+        background_jobs.add(asyncio.get_running_loop().create_task(job))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await chat.manager.close_all()
+    await notifications.close_all()
+    await analytics.flush(include_current=True)
 
 origins = [
     settings.frontend_url
@@ -55,7 +53,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+
+if settings.sql_profiler_enabled:
+    profiler.install(engine)
+    if read_engine is not None:
+        profiler.install(read_engine)
+    app.add_middleware(SQLProfilerMiddleware)
+
+    @app.get("/debug/sql-profile", include_in_schema=False)
+    def get_sql_profile():
+        return profiler.route_summary()
 
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
@@ -65,17 +75,22 @@ app.include_router(chat.router)
 app.include_router(follows.router)
 app.include_router(rtmp.router)
 app.include_router(upload.router)
+app.include_router(emotes.router)
+app.include_router(multiplex.router)
+app.include_router(notification_routes.router)
+app.include_router(metrics.router)
 
-app.include_router(faker_api.router)
+# dev-only routers are imported only when enabled, so production workers
+# never load Faker's locale data or the docs bundle
+OPTIONAL_ROUTERS = {
+    "mock_api_enabled": "app.faker_api",
+    "scalar_docs_enabled": "app.routes.docs",
+}
+for setting, module in OPTIONAL_ROUTERS.items():
+    if getattr(settings, setting):
+        app.include_router(importlib.import_module(module).router)
 
 @app.get("/")
 def root():
     return {"message": "Hello world"}
 
-
-@app.get("/scalar", include_in_schema=False)
-async def scalar_html():
-    return get_scalar_api_reference(
-        openapi_url=app.openapi_url,
-        title=app.title,
-    )
@@ -0,0 +1,232 @@
+# ./metrics.py
+# Prometheus text exposition without a client library. Each thread records
+# into its own shard (the event loop is one thread, the sync routes and DB
+# pool run in the threadpool), so recording never takes a lock; a scrape
+# sums the shards. Every uvicorn worker serves its own numbers.
+import functools
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import get_ident
+from typing import Callable, Iterator
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self.shards: dict[int, dict[Labels, float]] = {}
+
+    def inc(self, *labels: str, value: float = 1.0):
+        shard = self.shards.get(get_ident())
+        if shard is None:
+            shard = self.shards.setdefault(get_ident(), {})
+        shard[labels] = shard.get(labels, 0.0) + value
+
+    def render(self) -> list[str]:
+        totals: dict[Labels, float] = {}
+        for shard in list(self.shards.values()):
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0.0) + value
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in totals.items()]
+
+
+class HistogramSeries:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        self.shards: dict[int, dict[Labels, HistogramSeries]] = {}
+
+    def observe(self, value: float, *labels: str):
+        shard = self.shards.get(get_ident())
+        if shard is None:
+            shard = self.shards.setdefault(get_ident(), {})
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = HistogramSeries(len(self.buckets) + 1)
+        # counts are per bucket here and made cumulative when rendered
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def timed(self, *labels: str):
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.time(*labels):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self) -> list[str]:
+        totals: dict[Labels, HistogramSeries] = {}
+        for shard in list(self.shards.values()):
+            for labels, series in list(shard.items()):
+                total = totals.get(labels)
+                if total is None:
+                    total = totals[labels] = HistogramSeries(len(self.buckets) + 1)
+                total.counts = [a + b for a, b in zip(total.counts, series.counts)]
+                total.sum += series.sum
+
+        lines = []
+        for labels, series in totals.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Collected(Metric):
+    # a value read from existing state at scrape time, so recording costs nothing
+    def __init__(self, kind: str, name: str, help: str, labelnames: tuple[str, ...], collect: Callable[[], dict[Labels, float]]):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self.collect().items()
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge_func(self, name: str, help: str, labelnames: tuple[str, ...], collect: Callable[[], dict[Labels, float]]) -> Collected:
+        return self.register(Collected("gauge", name, help, labelnames, collect))
+
+    def counter_func(self, name: str, help: str, labelnames: tuple[str, ...], collect: Callable[[], dict[Labels, float]]) -> Collected:
+        return self.register(Collected("counter", name, help, labelnames, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.header())
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"Metric {metric.name} failed to render: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+CHAT_BROADCAST_SECONDS = registry.histogram(
+    "chat_broadcast_duration_seconds", "Time to fan a chat frame out to a stream's sockets."
+)
+CHAT_PERSIST_SECONDS = registry.histogram(
+    "chat_persist_duration_seconds", "Time to insert and commit one chat message."
+)
+DB_POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection."
+)
+RTMP_CALLBACK_SECONDS = registry.histogram(
+    "rtmp_callback_duration_seconds", "RTMP server callback latency.", ("callback",)
+)
+
+
+class MetricsMiddleware:
+    # plain ASGI rather than BaseHTTPMiddleware, which would wrap every
+    # response body in an extra task
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the matched route's template, never the raw path, keeps label
+            # cardinality bounded
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status)
+            )
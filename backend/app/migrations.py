@@ -0,0 +1,324 @@
+# ./migrations.py
+# python -m app.migrations   -> apply pending schema migrations; run before the workers start
+# An empty database gets the current schema from the models in one step.
+# A database created before versioning (no schema_version table) is at
+# version 0, the original create_all schema, and is brought forward one
+# step at a time. Transactional steps commit together with their version
+# bump; index builds run CONCURRENTLY outside a transaction so writes keep
+# flowing, and an interrupted build is dropped and redone on the next run.
+# Workers only compare the schema_version row against LATEST_VERSION.
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from sqlalchemy import exc, func, text
+from app import models, retention
+from app.database import SessionLocal, engine
+
+MIGRATION_LOCK_KEY = 12345
+
+# index name -> definition, shared by the partition conversion and the
+# per-partition builds
+CHAT_INDEXES = {
+    "ix_chats_stream_id_id": "(stream_id, id)",
+    "ix_chats_user_id_id": "(user_id, id)",
+    "ix_chats_stream_id_timestamp": '(stream_id, "timestamp")',
+    "ix_chats_search_vector": "USING gin (search_vector)",
+    "ix_chats_search_pending": "(id) WHERE search_vector IS NULL",
+}
+LEGACY_CHATS = retention.LEGACY_PARTITION
+LEGACY_CHATS_KEY = "chats_legacy_id_timestamp_key"
+LEGACY_CHATS_TIMESTAMP = "chats_legacy_timestamp"
+LEGACY_CHATS_RANGE = "chats_legacy_range"
+
+
+class Migration:
+    __slots__ = ("version", "name", "apply", "transactional")
+
+    def __init__(self, version: int, name: str, apply: Callable, transactional: bool):
+        self.version = version
+        self.name = name
+        self.apply = apply
+        self.transactional = transactional
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, transactional: bool = True):
+    def register(func):
+        MIGRATIONS.append(Migration(version, func.__name__, func, transactional))
+        return func
+    return register
+
+
+def index_valid(conn, name: str) -> Optional[bool]:
+    return conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name}
+    ).scalar()
+
+
+def create_index_concurrently(conn, name: str, table: str, definition: str, unique: bool = False):
+    valid = index_valid(conn, name)
+    if valid:
+        return
+    if valid is False:
+        # left behind by an interrupted CONCURRENTLY build
+        conn.execute(text(f"DROP INDEX CONCURRENTLY {name}"))
+    conn.execute(text(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {name} ON {table} {definition}"))
+
+
+def partition_index_name(partition: str, index: str) -> str:
+    return f"{partition}_{index.removeprefix('ix_chats_')}"
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return conn.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"),
+        {"table": table}
+    ).scalar() or False
+
+
+@migration(1)
+def add_stream_slow_mode(conn):
+    # a constant default is stored in the catalog, so no table rewrite
+    conn.execute(text("ALTER TABLE streams ADD COLUMN IF NOT EXISTS slow_mode_seconds INTEGER NOT NULL DEFAULT 0"))
+
+
+@migration(2)
+def create_feature_tables(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS blocked_terms (
+            id SERIAL PRIMARY KEY,
+            streamer_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            term VARCHAR(100) NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            CONSTRAINT unique_streamer_term UNIQUE (streamer_id, term)
+        )
+    """))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_blocked_terms_streamer_id ON blocked_terms (streamer_id)"))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS chat_replay_windows (
+            stream_id INTEGER NOT NULL REFERENCES streams (id) ON DELETE CASCADE,
+            "window" INTEGER NOT NULL,
+            first_chat_id INTEGER NOT NULL,
+            last_chat_id INTEGER NOT NULL,
+            message_count INTEGER NOT NULL,
+            PRIMARY KEY (stream_id, "window")
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS stream_minute_stats (
+            stream_id INTEGER NOT NULL REFERENCES streams (id) ON DELETE CASCADE,
+            minute TIMESTAMPTZ NOT NULL,
+            peak_viewers INTEGER NOT NULL,
+            viewer_seconds DOUBLE PRECISION NOT NULL,
+            messages INTEGER NOT NULL,
+            unique_chatters INTEGER NOT NULL,
+            PRIMARY KEY (stream_id, minute)
+        )
+    """))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS deletion_jobs (
+            id VARCHAR(32) PRIMARY KEY,
+            target_type VARCHAR(20) NOT NULL,
+            target_id INTEGER NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            deleted_rows INTEGER NOT NULL,
+            error VARCHAR,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            finished_at TIMESTAMPTZ
+        )
+    """))
+
+
+@migration(3)
+def add_chat_search_vector(conn):
+    conn.execute(text("ALTER TABLE chats ADD COLUMN IF NOT EXISTS search_vector TSVECTOR"))
+
+
+@migration(4, transactional=False)
+def index_hot_paths(conn):
+    create_index_concurrently(conn, "ix_follows_followed_id_id", "follows", "(followed_id, id)")
+    create_index_concurrently(conn, "ix_follows_follower_id_id", "follows", "(follower_id, id)")
+    create_index_concurrently(conn, "ix_streams_user_id", "streams", "(user_id)")
+    create_index_concurrently(conn, "ix_streams_live", "streams", "(id) WHERE is_live")
+    create_index_concurrently(conn, "ix_stream_viewers_user_id", "stream_viewers", "(user_id)")
+    create_index_concurrently(conn, "ix_chat_bans_banned_user_id", "chat_bans", "(banned_user_id)")
+
+
+@migration(5, transactional=False)
+def prebuild_legacy_chat_indexes(conn):
+    # built while chats is still a plain table, so attaching it as a
+    # partition in the next step finds every index in place
+    if is_partitioned(conn, "chats"):
+        return
+    create_index_concurrently(conn, LEGACY_CHATS_KEY, "chats", '(id, "timestamp")', unique=True)
+    # lets the next step find this week's rows without scanning the table
+    create_index_concurrently(conn, LEGACY_CHATS_TIMESTAMP, "chats", '("timestamp")')
+    for name, definition in CHAT_INDEXES.items():
+        create_index_concurrently(conn, partition_index_name(LEGACY_CHATS, name), "chats", definition)
+
+
+@migration(6)
+def partition_chats(conn):
+    # the existing table becomes the partition for everything before this
+    # week, so history is not copied; only this week's rows move. Retention
+    # archives and drops chats_legacy once this week is past its cutoff.
+    if is_partitioned(conn, "chats"):
+        return
+
+    now = datetime.now(timezone.utc)
+    week_start = retention.partition_bounds(now)[0].isoformat()
+
+    conn.execute(text(f"ALTER TABLE chats RENAME TO {LEGACY_CHATS}"))
+    for constraint in ("pkey", "stream_id_fkey", "user_id_fkey"):
+        conn.execute(text(f"ALTER TABLE {LEGACY_CHATS} RENAME CONSTRAINT chats_{constraint} TO {LEGACY_CHATS}_{constraint}"))
+    # indexes from before the prebuilt ones would clash with the parent's names
+    for name in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :table"), {"table": LEGACY_CHATS}).scalars().all():
+        if name.startswith("ix_chats_"):
+            conn.execute(text(f"DROP INDEX {name}"))
+
+    conn.execute(text("""
+        CREATE TABLE chats (
+            id INTEGER NOT NULL DEFAULT nextval('chats_id_seq'),
+            stream_id INTEGER NOT NULL REFERENCES streams (id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            message VARCHAR NOT NULL,
+            "timestamp" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            search_vector TSVECTOR,
+            CONSTRAINT chats_pkey PRIMARY KEY (id, "timestamp")
+        ) PARTITION BY RANGE ("timestamp")
+    """))
+    conn.execute(text("ALTER SEQUENCE chats_id_seq OWNED BY chats.id"))
+    retention.ensure_partitions(conn, now)
+
+    conn.execute(text(f"""
+        INSERT INTO chats (id, stream_id, user_id, message, "timestamp", search_vector)
+        SELECT id, stream_id, user_id, message, "timestamp", search_vector
+        FROM {LEGACY_CHATS} WHERE "timestamp" >= :week_start
+    """), {"week_start": week_start})
+    conn.execute(text(f'DELETE FROM {LEGACY_CHATS} WHERE "timestamp" >= :week_start'), {"week_start": week_start})
+    conn.execute(text(f"DROP INDEX IF EXISTS {LEGACY_CHATS_TIMESTAMP}"))
+
+    # a partition of a table with a primary key needs a matching constraint
+    conn.execute(text(
+        f"ALTER TABLE {LEGACY_CHATS} DROP CONSTRAINT {LEGACY_CHATS}_pkey, "
+        f"ADD CONSTRAINT {LEGACY_CHATS_KEY} PRIMARY KEY USING INDEX {LEGACY_CHATS_KEY}"
+    ))
+    # a validated constraint that implies the partition bound spares ATTACH
+    # its own check of every row
+    conn.execute(text(
+        f"ALTER TABLE {LEGACY_CHATS} ADD CONSTRAINT {LEGACY_CHATS_RANGE} "
+        f"CHECK (\"timestamp\" < '{week_start}') NOT VALID"
+    ))
+    conn.execute(text(f"ALTER TABLE {LEGACY_CHATS} VALIDATE CONSTRAINT {LEGACY_CHATS_RANGE}"))
+    conn.execute(text(
+        f"ALTER TABLE chats ATTACH PARTITION {LEGACY_CHATS} FOR VALUES FROM (MINVALUE) TO ('{week_start}')"
+    ))
+    conn.execute(text(f"ALTER TABLE {LEGACY_CHATS} DROP CONSTRAINT {LEGACY_CHATS_RANGE}"))
+
+
+@migration(7, transactional=False)
+def index_chat_partitions(conn):
+    # CONCURRENTLY is not available on a partitioned table: the parent index
+    # is created invalid with ON ONLY, each partition builds its own
+    # concurrently and attaching the last one makes the parent valid.
+    # Partitions created after this clone the parent's indexes themselves.
+    for name, definition in CHAT_INDEXES.items():
+        if index_valid(conn, name):
+            continue
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY chats {definition}"))
+        for partition in retention.partitions(conn):
+            attached = conn.execute(text("""
+                SELECT 1
+                FROM pg_inherits
+                JOIN pg_index ON pg_index.indexrelid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = to_regclass(:parent) AND pg_index.indrelid = to_regclass(:partition)
+            """), {"parent": name, "partition": partition}).scalar()
+            if attached:
+                continue
+            child = partition_index_name(partition, name)
+            create_index_concurrently(conn, child, partition, definition)
+            conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+
+@migration(8)
+def add_minute_stats_worker(conn):
+    conn.execute(text("ALTER TABLE stream_minute_stats ADD COLUMN IF NOT EXISTS worker VARCHAR(32) NOT NULL DEFAULT ''"))
+    conn.execute(text(
+        "ALTER TABLE stream_minute_stats DROP CONSTRAINT stream_minute_stats_pkey, "
+        "ADD PRIMARY KEY (stream_id, minute, worker)"
+    ))
+
+
+LATEST_VERSION = max(migration.version for migration in MIGRATIONS)
+
+
+def set_version(conn, version: int):
+    conn.execute(text("UPDATE schema_version SET version = :version"), {"version": version})
+
+
+def prepare(conn) -> Optional[int]:
+    # the starting version, or None when the schema was created outright
+    if conn.execute(text("SELECT to_regclass('schema_version')")).scalar() is not None:
+        return conn.execute(text("SELECT version FROM schema_version")).scalar()
+
+    if conn.execute(text("SELECT to_regclass('users')")).scalar() is None:
+        print("Creating database schema...")
+        models.Base.metadata.create_all(conn)
+        retention.ensure_partitions(conn, datetime.now(timezone.utc))
+        conn.execute(models.SchemaVersion.__table__.insert().values(version=LATEST_VERSION))
+        print(f"Database schema created at version {LATEST_VERSION}")
+        return None
+
+    models.SchemaVersion.__table__.create(conn)
+    conn.execute(models.SchemaVersion.__table__.insert().values(version=0))
+    return 0
+
+
+def migrate():
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        # a second migrator waits here and then finds nothing left to do
+        lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            with engine.begin() as conn:
+                version = prepare(conn)
+            if version is None:
+                return
+
+            for step in sorted(MIGRATIONS, key=lambda step: step.version):
+                if step.version <= version:
+                    continue
+                print(f"Applying migration {step.version} ({step.name})...")
+                started = time.monotonic()
+                if step.transactional:
+                    with engine.begin() as conn:
+                        step.apply(conn)
+                        set_version(conn, step.version)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        step.apply(conn)
+                        set_version(conn, step.version)
+                print(f"Migration {step.version} applied in {time.monotonic() - started:.1f}s")
+            print(f"Database schema is at version {LATEST_VERSION}")
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def check_version():
+    try:
+        with SessionLocal() as db:
+            version = db.query(func.max(models.SchemaVersion.version)).scalar()
+    except exc.ProgrammingError:
+        # no schema_version table yet
+        version = None
+    if version is None or version < LATEST_VERSION:
+        raise RuntimeError(
+            f"Database schema is at version {version}, this build needs {LATEST_VERSION}; "
+            "run python -m app.migrations first"
+        )
+
+
+if __name__ == "__main__":
+    migrate()
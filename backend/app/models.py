@@ -5,11 +5,14 @@ from sqlalchemy import (
     Integer,
     String,
     Boolean,
+    Float,
     TIMESTAMP,
     text,
+    Index,
     UniqueConstraint
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
 
 
@@ -24,18 +27,21 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), nullable=False)
 
-    streams = relationship("Stream", back_populates="owner", cascade="all, delete")
+    # dependents are removed by the ON DELETE CASCADE foreign keys, not row by row
+    streams = relationship("Stream", back_populates="owner", cascade="all, delete", passive_deletes=True)
     following = relationship(
         "Follow",
         foreign_keys="[Follow.follower_id]",
-        cascade="all, delete"
+        cascade="all, delete",
+        passive_deletes=True
     )
     followers = relationship(
         "Follow",
         foreign_keys="[Follow.followed_id]",
-        cascade="all, delete"
+        cascade="all, delete",
+        passive_deletes=True
     )
-    chats = relationship("Chat", back_populates="user", cascade="all, delete")
+    chats = relationship("Chat", back_populates="user", cascade="all, delete", passive_deletes=True)
 
 # STREAMS
 class Stream(Base):
@@ -50,9 +56,16 @@ class Stream(Base):
     started_at = Column(TIMESTAMP(timezone=True))
     ended_at = Column(TIMESTAMP(timezone=True))
     stream_key = Column(String, nullable=False, unique=True)
+    slow_mode_seconds = Column(Integer, nullable=False, default=0, server_default=text("0"))
+
+    __table_args__ = (
+        Index("ix_streams_user_id", "user_id"),
+        # the homepage only ever reads the handful of live streams
+        Index("ix_streams_live", "id", postgresql_where=text("is_live")),
+    )
 
     owner = relationship("User", back_populates="streams")
-    chat_messages = relationship("Chat", back_populates="stream", cascade="all, delete")
+    chat_messages = relationship("Chat", back_populates="stream", cascade="all, delete", passive_deletes=True)
 
 class StreamViewer(Base):
     __tablename__ = "stream_viewers"
@@ -64,6 +77,7 @@ class StreamViewer(Base):
     
     __table_args__ = (
         UniqueConstraint("stream_id", "user_id", name="unique_stream_viewer"),
+        Index("ix_stream_viewers_user_id", "user_id"),
     )
     
     stream = relationship("Stream")
@@ -75,6 +89,8 @@ class Follow(Base):
     __tablename__ = "follows"
     __table_args__ = (
         UniqueConstraint("follower_id", "followed_id", name="unique_follow"),
+        Index("ix_follows_followed_id_id", "followed_id", "id"),
+        Index("ix_follows_follower_id_id", "follower_id", "id"),
     )
 
     id = Column(Integer, primary_key=True)
@@ -87,15 +103,28 @@ class Follow(Base):
 class Chat(Base):
     __tablename__ = "chats"
 
-    id = Column(Integer, primary_key=True)
+    # range-partitioned on timestamp (see app.retention), which Postgres
+    # requires to be part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True)
     stream_id = Column(Integer, ForeignKey("streams.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     message = Column(String, nullable=False)
-    timestamp = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), nullable=False)
+    timestamp = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), nullable=False, primary_key=True)
+    # filled in batches by app.search.run_indexer
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
 
     user = relationship("User", back_populates="chats")
     stream = relationship("Stream", back_populates="chat_messages")
 
+    __table_args__ = (
+        Index("ix_chats_stream_id_id", "stream_id", "id"),
+        Index("ix_chats_user_id_id", "user_id", "id"),
+        Index("ix_chats_stream_id_timestamp", "stream_id", "timestamp"),
+        Index("ix_chats_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_chats_search_pending", "id", postgresql_where=text("search_vector IS NULL")),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
 
 # CHAT BANS
 class ChatBan(Base):
@@ -109,9 +138,74 @@ class ChatBan(Base):
 
     __table_args__ = (
         UniqueConstraint("streamer_id", "banned_user_id", name="unique_streamer_ban"),
+        Index("ix_chat_bans_banned_user_id", "banned_user_id"),
     )
 
 
+# BLOCKED TERMS
+class BlockedTerm(Base):
+    __tablename__ = "blocked_terms"
+
+    id = Column(Integer, primary_key=True)
+    streamer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    term = Column(String(100), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("streamer_id", "term", name="unique_streamer_term"),
+    )
+
+
+# CHAT REPLAY WINDOWS
+# built by app.replay when a stream ends, one row per non-empty window of
+# chat_replay_window_seconds counted from the stream's started_at
+class ChatReplayWindow(Base):
+    __tablename__ = "chat_replay_windows"
+
+    stream_id = Column(Integer, ForeignKey("streams.id", ondelete="CASCADE"), primary_key=True)
+    window = Column(Integer, primary_key=True)
+    first_chat_id = Column(Integer, nullable=False)
+    last_chat_id = Column(Integer, nullable=False)
+    message_count = Column(Integer, nullable=False)
+
+
+# STREAM MINUTE STATS
+# per-minute rollups flushed by app.analytics
+class StreamMinuteStats(Base):
+    __tablename__ = "stream_minute_stats"
+
+    stream_id = Column(Integer, ForeignKey("streams.id", ondelete="CASCADE"), primary_key=True)
+    minute = Column(TIMESTAMP(timezone=True), primary_key=True)
+    # each worker process writes its own row per minute; readers sum them
+    worker = Column(String(32), primary_key=True, server_default="")
+    peak_viewers = Column(Integer, nullable=False, default=0)
+    viewer_seconds = Column(Float, nullable=False, default=0)
+    messages = Column(Integer, nullable=False, default=0)
+    unique_chatters = Column(Integer, nullable=False, default=0)
+
+
+# DELETION JOBS
+# progress of large account/stream deletions run by app.deletion; kept
+# without foreign keys so the row outlives what it deleted
+class DeletionJob(Base):
+    __tablename__ = "deletion_jobs"
+
+    id = Column(String(32), primary_key=True)
+    target_type = Column(String(20), nullable=False)
+    target_id = Column(Integer, nullable=False)
+    status = Column(String(20), nullable=False, default="pending")
+    deleted_rows = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"), nullable=False)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+
+# SCHEMA VERSION
+# single row written by app.migrations; workers only read it at startup
+class SchemaVersion(Base):
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
 
 
 # ╲⎝⧹༼◕ ͜ﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞﱞo.◕ ༽⧸⎠╱⧸
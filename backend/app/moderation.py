@@ -0,0 +1,141 @@
+# ./moderation.py
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Iterable, Optional
+from fastapi.concurrency import run_in_threadpool
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+TERMS_CACHE_TTL_SECONDS = 60
+
+
+class TermMatcher:
+    # Aho-Corasick automaton: one pass over the message whatever the number of terms
+    __slots__ = ("goto", "fail", "output", "terms")
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms = frozenset(term.strip().lower() for term in terms if term.strip())
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[tuple[int, ...]] = [()]
+
+        for term in self.terms:
+            state = 0
+            for ch in term:
+                next_state = self.goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][ch] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            self.output[state] = (len(term),)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                if self.output[self.fail[next_state]]:
+                    self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def search(self, message: str) -> Optional[str]:
+        if not self.terms:
+            return None
+
+        text = message.lower()
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                end = i + 1
+                # whole-word matches only, so "class" does not trip on "ass"
+                if end < len(text) and text[end].isalnum():
+                    continue
+                for length in output[state]:
+                    start = end - length
+                    if start == 0 or not text[start - 1].isalnum():
+                        return text[start:end]
+        return None
+
+
+def load_global_terms(path: Optional[str]) -> frozenset[str]:
+    if not path or not os.path.exists(path):
+        return frozenset()
+    with open(path) as f:
+        return frozenset(line.strip().lower() for line in f if line.strip() and not line.startswith("#"))
+
+
+class ModerationCache:
+    # the global list gets one matcher shared by every channel; each
+    # streamer's matcher holds only their own terms, and a message is
+    # checked against both
+    def __init__(self, global_terms: frozenset[str], ttl: float = TERMS_CACHE_TTL_SECONDS):
+        self.global_matcher = TermMatcher(global_terms)
+        self.ttl = ttl
+        self.matchers: dict[int, TermMatcher] = {}
+        self.loaded_at: dict[int, float] = {}
+        self.loading: dict[int, asyncio.Future] = {}
+
+    def load(self, streamer_id: int) -> TermMatcher:
+        with SessionLocal() as db:
+            rows = db.query(models.BlockedTerm.term).filter(
+                models.BlockedTerm.streamer_id == streamer_id
+            ).all()
+        terms = frozenset(term.strip().lower() for term, in rows if term.strip())
+
+        matcher = self.matchers.get(streamer_id)
+        if matcher is None or matcher.terms != terms:
+            matcher = TermMatcher(terms)
+            self.matchers[streamer_id] = matcher
+        self.loaded_at[streamer_id] = time.monotonic()
+        return matcher
+
+    def stale(self, streamer_id: int) -> bool:
+        loaded_at = self.loaded_at.get(streamer_id)
+        return loaded_at is None or time.monotonic() - loaded_at > self.ttl
+
+    async def ensure(self, streamer_id: int):
+        # the query and rebuild run in the threadpool; sockets of the same
+        # channel share one load, and a failed load keeps the previous matcher
+        if not self.stale(streamer_id):
+            return
+        loading = self.loading.get(streamer_id)
+        if loading is None:
+            loading = self.loading[streamer_id] = asyncio.ensure_future(run_in_threadpool(self.load, streamer_id))
+            loading.add_done_callback(lambda _: self.loading.pop(streamer_id, None))
+        try:
+            await asyncio.shield(loading)
+        except Exception as e:
+            print(f"Failed to load blocked terms for streamer {streamer_id}: {e}")
+
+    def search(self, streamer_id: int, message: str) -> Optional[str]:
+        found = self.global_matcher.search(message)
+        if found is None:
+            matcher = self.matchers.get(streamer_id)
+            if matcher is not None:
+                found = matcher.search(message)
+        return found
+
+    def invalidate(self, streamer_id: int):
+        self.loaded_at[streamer_id] = float("-inf")
+
+
+moderation = ModerationCache(load_global_terms(settings.global_blocked_terms_path))
@@ -0,0 +1,74 @@
+# ./multiplex.py
+from typing import Optional
+from fastapi import WebSocket
+from app import framing
+from app.connections import Connection
+
+CHAT = "chat"
+VIEWERS = "viewers"
+TOPICS = {CHAT, VIEWERS}
+
+
+class Subscriber(Connection):
+    __slots__ = ("topics",)
+
+    def __init__(self, websocket: WebSocket, user_id: Optional[int], encoding: str):
+        super().__init__(websocket, 0, user_id, encoding)
+        self.topics: set[tuple[str, int]] = set()
+
+
+class MultiplexHub:
+    def __init__(self):
+        self.subscribers: dict[WebSocket, Subscriber] = {}
+        self.topics: dict[tuple[str, int], set[Subscriber]] = {}
+
+    def __len__(self) -> int:
+        return len(self.subscribers)
+
+    def add(self, websocket: WebSocket, user_id: Optional[int], encoding: str) -> Subscriber:
+        subscriber = Subscriber(websocket, user_id, encoding)
+        self.subscribers[websocket] = subscriber
+        return subscriber
+
+    def remove(self, websocket: WebSocket) -> Optional[Subscriber]:
+        subscriber = self.subscribers.pop(websocket, None)
+        if subscriber is not None:
+            for topic in list(subscriber.topics):
+                self.unsubscribe(subscriber, topic)
+        return subscriber
+
+    def subscribe(self, subscriber: Subscriber, topic: tuple[str, int]):
+        subscriber.topics.add(topic)
+        self.topics.setdefault(topic, set()).add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber, topic: tuple[str, int]):
+        subscriber.topics.discard(topic)
+        subscribers = self.topics.get(topic)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.topics[topic]
+
+    def unsubscribe_user(self, topic: tuple[str, int], user_id: int) -> list[Subscriber]:
+        subscribers = [subscriber for subscriber in self.topics.get(topic, ()) if subscriber.user_id == user_id]
+        for subscriber in subscribers:
+            self.unsubscribe(subscriber, topic)
+        return subscribers
+
+    def has_subscribers(self, topic: tuple[str, int]) -> bool:
+        return topic in self.topics
+
+    async def publish(self, topic: tuple[str, int], message: dict):
+        subscribers = self.topics.get(topic)
+        if not subscribers:
+            return
+
+        frames = framing.FrameCache({**message, "stream_id": topic[1]})
+        for subscriber in list(subscribers):
+            try:
+                await framing.send_frame(subscriber.websocket, frames.get(subscriber.encoding))
+            except Exception:
+                self.remove(subscriber.websocket)
+
+
+hub = MultiplexHub()
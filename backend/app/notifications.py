@@ -0,0 +1,233 @@
+# ./notifications.py
+import asyncio
+import json
+from typing import Awaitable, Callable, Optional
+from fastapi import WebSocket
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session, joinedload
+from app import framing, models, schemas
+from app.config import settings
+from app.connections import Connection, ConnectionRegistry
+from app.database import SessionLocal, engine
+from app.heartbeat import heartbeat
+from app.trending import trending
+
+# per-user sockets are not tied to a stream, so they all share this key
+USER_SOCKETS = 0
+
+# events every worker has to see (go-live, bans, deleted messages) travel
+# through Postgres LISTEN/NOTIFY; payloads carry ids only since NOTIFY caps
+# them at 8000 bytes
+GO_LIVE_CHANNEL = "stream_live"
+
+
+def notify(db: Session, channel: str, payload: dict):
+    # delivered to every worker's listener once db commits, and not at all
+    # if it rolls back
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": json.dumps(payload)})
+
+
+def followers_after(streamer_id: int, after_id: int, limit: int) -> list[tuple[int, int]]:
+    # keyset walk over ix_follows_followed_id_id
+    with SessionLocal() as db:
+        return (
+            db.query(models.Follow.id, models.Follow.follower_id)
+            .filter(models.Follow.followed_id == streamer_id, models.Follow.id > after_id)
+            .order_by(models.Follow.id.asc())
+            .limit(limit)
+            .all()
+        )
+
+
+def followers_among(streamer_id: int, user_ids: list[int]) -> list[int]:
+    with SessionLocal() as db:
+        rows = db.query(models.Follow.follower_id).filter(
+            models.Follow.followed_id == streamer_id,
+            models.Follow.follower_id.in_(user_ids)
+        ).all()
+    return [follower_id for follower_id, in rows]
+
+
+def announce_go_live(stream_id: int, streamer_id: int):
+    with SessionLocal() as db:
+        # the one follower count a stream's trending score needs; follows
+        # and unfollows while live adjust it from then on
+        followers = db.query(func.count(models.Follow.id)).filter(models.Follow.followed_id == streamer_id).scalar()
+        notify(db, GO_LIVE_CHANNEL, {"stream_id": stream_id, "streamer_id": streamer_id, "followers": followers})
+        db.commit()
+
+
+def load_live_stream(stream_id: int) -> Optional[dict]:
+    with SessionLocal() as db:
+        stream = (
+            db.query(models.Stream)
+            .options(joinedload(models.Stream.owner))
+            .filter(models.Stream.id == stream_id, models.Stream.is_live == True)
+            .first()
+        )
+        if stream is None:
+            return None
+        return schemas.StreamResponse.model_validate(stream).model_dump(mode="json")
+
+
+def listen(channels: list[str]):
+    # a connection of its own, detached from the pool it would otherwise
+    # hold a slot of for the life of the worker
+    pooled = engine.raw_connection()
+    connection = pooled.driver_connection
+    pooled.detach()
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        for channel in channels:
+            cursor.execute(f"LISTEN {channel}")
+    return connection
+
+
+class NotificationHub:
+    def __init__(self, batch_size: int, reconnect_seconds: float):
+        self.batch_size = batch_size
+        self.reconnect_seconds = reconnect_seconds
+        self.registry = ConnectionRegistry()
+        # the loop only keeps weak references to tasks
+        self.tasks: set[asyncio.Task] = set()
+        self.handlers: dict[str, Callable[[dict], Awaitable[None]]] = {GO_LIVE_CHANNEL: self.on_go_live}
+        self.resyncs: list[Callable[[], None]] = []
+
+    def handle(self, channel: str, handler: Callable[[dict], Awaitable[None]], resync: Optional[Callable[[], None]] = None):
+        # resync runs whenever the listener (re)connects: whatever was sent
+        # while it was away is lost, so state kept current by the channel
+        # has to be dropped and reloaded
+        self.handlers[channel] = handler
+        if resync is not None:
+            self.resyncs.append(resync)
+
+    def spawn(self, coroutine) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def connect(self, websocket: WebSocket, user_id: int, encoding: str) -> Connection:
+        connection = self.registry.add(websocket, USER_SOCKETS, user_id, encoding=encoding)
+        heartbeat.track(connection)
+        return connection
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.registry.remove(websocket)
+        if connection is not None:
+            heartbeat.untrack(connection)
+
+    def online_users(self) -> list[int]:
+        return [user_id for _, user_id in self.registry.by_user]
+
+    async def send_to(self, user_ids: list[int], frames: framing.FrameCache) -> int:
+        connections = [
+            connection
+            for user_id in user_ids
+            for connection in self.registry.user(USER_SOCKETS, user_id)
+        ]
+        results = await asyncio.gather(
+            *(framing.send_frame(connection.websocket, frames.get(connection.encoding)) for connection in connections),
+            return_exceptions=True
+        )
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(connection.websocket)
+        return len(connections)
+
+    async def notify_followers(self, streamer_id: int, message: dict) -> int:
+        online = self.online_users()
+        if not online:
+            return 0
+
+        frames = framing.FrameCache(message)
+
+        # with few users online it is cheaper to ask which of them follow
+        # the streamer than to walk the whole follower list
+        if len(online) <= self.batch_size:
+            follower_ids = await run_in_threadpool(followers_among, streamer_id, online)
+            return await self.send_to(follower_ids, frames)
+
+        sent = 0
+        after_id = 0
+        while True:
+            rows = await run_in_threadpool(followers_after, streamer_id, after_id, self.batch_size)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            sent += await self.send_to(
+                [follower_id for _, follower_id in rows if (USER_SOCKETS, follower_id) in self.registry.by_user],
+                frames
+            )
+            if len(rows) < self.batch_size:
+                break
+        return sent
+
+    async def notify_go_live(self, stream: dict):
+        try:
+            sent = await self.notify_followers(stream["owner"]["id"], {
+                "type": "stream_live",
+                "data": stream
+            })
+            print(f"Notified {sent} followers of {stream['owner']['username']} going live")
+        except Exception as e:
+            print(f"Go-live notification for stream {stream['id']} failed: {e}")
+
+    async def announce_go_live(self, stream_id: int, streamer_id: int):
+        try:
+            await run_in_threadpool(announce_go_live, stream_id, streamer_id)
+        except Exception as e:
+            print(f"Go-live announcement for stream {stream_id} failed: {e}")
+
+    async def on_go_live(self, event: dict):
+        trending.start(event["stream_id"], event["streamer_id"], event["followers"])
+        try:
+            stream = await run_in_threadpool(load_live_stream, event["stream_id"])
+        except Exception as e:
+            print(f"Go-live notification for stream {event['stream_id']} failed: {e}")
+            return
+        if stream is not None:
+            await self.notify_go_live(stream)
+
+    async def run_listener(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                listener = await run_in_threadpool(listen, list(self.handlers))
+            except Exception as e:
+                print(f"Event listener failed to connect: {e}")
+                await asyncio.sleep(self.reconnect_seconds)
+                continue
+            for resync in self.resyncs:
+                resync()
+
+            # by fd: a connection the server closed no longer reports one
+            fd = listener.fileno()
+            readable = asyncio.Event()
+            loop.add_reader(fd, readable.set)
+            try:
+                while True:
+                    await readable.wait()
+                    readable.clear()
+                    listener.poll()
+                    while listener.notifies:
+                        event = listener.notifies.pop(0)
+                        self.spawn(self.handlers[event.channel](json.loads(event.payload)))
+            except Exception as e:
+                print(f"Event listener lost its connection: {e}")
+            finally:
+                loop.remove_reader(fd)
+                listener.close()
+            await asyncio.sleep(self.reconnect_seconds)
+
+    async def close_all(self, code: int = 1012):
+        for connection in list(self.registry.connections.values()):
+            self.disconnect(connection.websocket)
+            try:
+                await connection.websocket.close(code=code)
+            except Exception:
+                pass
+
+
+notifications = NotificationHub(settings.notification_batch_size, settings.notification_reconnect_seconds)
@@ -0,0 +1,151 @@
+# ./profiler.py
+# Debug-only SQL profiler, enabled with SQL_PROFILER_ENABLED=true. Every HTTP
+# request and WebSocket message gets a profile through a context variable
+# (sync routes run in the threadpool with a copy of the context, so they
+# record into the same profile). Statements repeated within one profile are
+# reported as N+1 candidates; route_summary() is what tests assert on.
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+class QueryProfile:
+    __slots__ = ("label", "queries", "seconds", "statements")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: dict[str, int] = {}
+
+    def record(self, statement: str, seconds: float):
+        self.queries += 1
+        self.seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+
+class RouteStats:
+    __slots__ = ("calls", "queries", "max_queries", "seconds", "n_plus_one")
+
+    def __init__(self):
+        self.calls = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.seconds = 0.0
+        self.n_plus_one: set[str] = set()
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+
+
+class SQLProfiler:
+    def __init__(self, slow_query_ms: float, n_plus_one_threshold: int):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.routes: dict[str, RouteStats] = {}
+        self.installed = False
+
+    def install(self, engine: Engine):
+        if event.contains(engine, "before_cursor_execute", self._before_cursor_execute):
+            return
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        self.installed = True
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        profile = current_profile.get()
+        if profile is not None:
+            profile.record(statement, seconds)
+        if seconds >= self.slow_query_seconds:
+            where = f" in {profile.label}" if profile is not None else ""
+            print(f"Slow query ({seconds * 1000:.1f} ms){where}: {statement} {parameters!r}")
+
+    @contextmanager
+    def profile(self, label: str) -> Iterator[Optional[QueryProfile]]:
+        if not self.installed:
+            yield None
+            return
+
+        profile = QueryProfile(label)
+        token = current_profile.set(profile)
+        try:
+            yield profile
+        finally:
+            current_profile.reset(token)
+            self.finish(profile)
+
+    def finish(self, profile: QueryProfile):
+        stats = self.routes.get(profile.label)
+        if stats is None:
+            stats = self.routes[profile.label] = RouteStats()
+        stats.calls += 1
+        stats.queries += profile.queries
+        stats.max_queries = max(stats.max_queries, profile.queries)
+        stats.seconds += profile.seconds
+
+        for statement, count in profile.repeated(self.n_plus_one_threshold).items():
+            if statement not in stats.n_plus_one:
+                print(f"Possible N+1 in {profile.label}: {count}x {statement}")
+            stats.n_plus_one.add(statement)
+
+    def route_summary(self) -> dict[str, dict]:
+        return {
+            label: {
+                "calls": stats.calls,
+                "queries": stats.queries,
+                "avg_queries": round(stats.queries / stats.calls, 2),
+                "max_queries": stats.max_queries,
+                "query_ms": round(stats.seconds * 1000, 2),
+                "n_plus_one": sorted(stats.n_plus_one),
+            }
+            for label, stats in sorted(self.routes.items())
+        }
+
+    def reset(self):
+        self.routes.clear()
+
+
+class SQLProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile("unmatched")
+        token = current_profile.set(profile)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (QUERY_COUNT_HEADER.lower().encode(), str(profile.queries).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            current_profile.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                profile.label = f"{scope['method']} {route.path}"
+            profiler.finish(profile)
+
+
+profiler = SQLProfiler(settings.sql_slow_query_ms, settings.sql_n_plus_one_threshold)
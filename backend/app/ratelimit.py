@@ -0,0 +1,139 @@
+# ./ratelimit.py
+import time
+from typing import Hashable, Optional
+from app.config import settings
+
+SWEEP_EVERY = 4096
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        # a bucket idle this long is full again and can be forgotten
+        self.refill_seconds = burst / rate
+        self.buckets: dict[Hashable, TokenBucket] = {}
+        self.calls = 0
+
+    def wait(self, key: Hashable, now: float) -> float:
+        # refills the bucket and says how long until a token is free, without
+        # spending one
+        self.calls += 1
+        if self.calls % SWEEP_EVERY == 0:
+            self.sweep(now)
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = TokenBucket(self.burst, now)
+            return 0.0
+
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+        if bucket.tokens >= 1:
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+    def spend(self, key: Hashable):
+        self.buckets[key].tokens -= 1
+
+    def acquire(self, key: Hashable, now: float) -> float:
+        retry_after = self.wait(key, now)
+        if not retry_after:
+            self.spend(key)
+        return retry_after
+
+    def sweep(self, now: float):
+        stale = [key for key, bucket in self.buckets.items() if now - bucket.updated >= self.refill_seconds]
+        for key in stale:
+            del self.buckets[key]
+
+
+class ChatFloodControl:
+    def __init__(self, user_rate: float, user_burst: float, stream_rate: float, stream_burst: float, slow_mode_refresh: float):
+        self.users = RateLimiter(user_rate, user_burst)
+        self.streams = RateLimiter(stream_rate, stream_burst)
+        self.slow_mode: dict[int, int] = {}
+        self.slow_mode_refresh = slow_mode_refresh
+        self.slow_mode_checked: dict[int, float] = {}
+        self.last_message: dict[tuple[int, int], float] = {}
+        self.dropped = 0
+
+    def set_slow_mode(self, stream_id: int, seconds: int, now: Optional[float] = None):
+        self.slow_mode_checked[stream_id] = time.monotonic() if now is None else now
+        if seconds > 0:
+            self.slow_mode[stream_id] = seconds
+        else:
+            self.slow_mode.pop(stream_id, None)
+
+    def slow_mode_due(self, stream_id: int, now: Optional[float] = None) -> bool:
+        # slow mode is changed on whichever worker handled the PUT, so every
+        # worker re-reads it this often; the first caller claims the refresh
+        if now is None:
+            now = time.monotonic()
+        checked = self.slow_mode_checked.get(stream_id)
+        if checked is not None and now - checked < self.slow_mode_refresh:
+            return False
+        self.slow_mode_checked[stream_id] = now
+        return True
+
+    def check(self, stream_id: int, user_id: int, exempt: bool = False, now: Optional[float] = None) -> tuple[Optional[str], float]:
+        if now is None:
+            now = time.monotonic()
+
+        if self.users.calls % SWEEP_EVERY == SWEEP_EVERY - 1:
+            self._sweep_slow_mode(now)
+
+        slow_seconds = self.slow_mode.get(stream_id)
+        if slow_seconds and not exempt:
+            last = self.last_message.get((stream_id, user_id))
+            if last is not None and now - last < slow_seconds:
+                self.dropped += 1
+                return "slow_mode", slow_seconds - (now - last)
+
+        # both buckets are checked before either is spent, so a message the
+        # stream bucket turns away does not cost the sender a token
+        retry_after = self.users.wait(user_id, now)
+        if retry_after:
+            self.dropped += 1
+            return "user_rate_limited", retry_after
+
+        retry_after = self.streams.wait(stream_id, now)
+        if retry_after:
+            self.dropped += 1
+            return "stream_rate_limited", retry_after
+
+        self.users.spend(user_id)
+        self.streams.spend(stream_id)
+
+        if slow_seconds:
+            self.last_message[(stream_id, user_id)] = now
+        return None, 0.0
+
+    def _sweep_slow_mode(self, now: float):
+        stale = [
+            key for key, last in self.last_message.items()
+            if now - last >= self.slow_mode.get(key[0], 0)
+        ]
+        for key in stale:
+            del self.last_message[key]
+
+        stale = [stream_id for stream_id, checked in self.slow_mode_checked.items() if now - checked >= self.slow_mode_refresh]
+        for stream_id in stale:
+            del self.slow_mode_checked[stream_id]
+
+
+flood_control = ChatFloodControl(
+    settings.chat_user_rate,
+    settings.chat_user_burst,
+    settings.chat_stream_rate,
+    settings.chat_stream_burst,
+    settings.chat_slow_mode_refresh_seconds
+)
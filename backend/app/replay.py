@@ -0,0 +1,89 @@
+# ./replay.py
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import Integer, func
+from sqlalchemy.orm import Session, joinedload
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+
+def window_bounds(started_at: datetime, window: int) -> tuple[datetime, datetime]:
+    size = timedelta(seconds=settings.chat_replay_window_seconds)
+    start = started_at + window * size
+    return start, start + size
+
+
+def build_replay_index(stream_id: int) -> int:
+    with SessionLocal() as db:
+        stream = db.query(models.Stream).filter(models.Stream.id == stream_id).first()
+        if not stream or not stream.started_at or not stream.ended_at:
+            return 0
+
+        window = func.floor(
+            func.extract("epoch", models.Chat.timestamp - stream.started_at) / settings.chat_replay_window_seconds
+        ).cast(Integer).label("window")
+        rows = (
+            db.query(
+                window,
+                func.min(models.Chat.id),
+                func.max(models.Chat.id),
+                func.count(models.Chat.id),
+            )
+            .filter(
+                models.Chat.stream_id == stream_id,
+                models.Chat.timestamp >= stream.started_at,
+                models.Chat.timestamp <= stream.ended_at,
+            )
+            .group_by(window)
+            .all()
+        )
+
+        db.query(models.ChatReplayWindow).filter(models.ChatReplayWindow.stream_id == stream_id).delete()
+        db.bulk_insert_mappings(models.ChatReplayWindow, [
+            {
+                "stream_id": stream_id,
+                "window": window,
+                "first_chat_id": first_chat_id,
+                "last_chat_id": last_chat_id,
+                "message_count": message_count,
+            }
+            for window, first_chat_id, last_chat_id, message_count in rows
+        ])
+        db.commit()
+        return len(rows)
+
+
+def replay_window(db: Session, stream: models.Stream, window: int) -> tuple[list[models.Chat], Optional[int]]:
+    start, end = window_bounds(stream.started_at, window)
+    query = db.query(models.Chat).options(joinedload(models.Chat.user)).filter(
+        models.Chat.stream_id == stream.id,
+        models.Chat.timestamp >= start,
+        models.Chat.timestamp < end,
+    )
+
+    query = query.order_by(models.Chat.timestamp.asc())
+
+    if stream.is_live:
+        return query.all(), None
+
+    # once the stream has ended the precomputed windows let empty stretches
+    # be skipped without touching chats at all
+    windows = (
+        db.query(models.ChatReplayWindow)
+        .filter(models.ChatReplayWindow.stream_id == stream.id, models.ChatReplayWindow.window >= window)
+        .order_by(models.ChatReplayWindow.window.asc())
+        .limit(2)
+        .all()
+    )
+    if not windows:
+        # past the last window, or the index has not been built yet
+        return query.all(), None
+
+    upcoming = [row.window for row in windows if row.window > window]
+    next_window = upcoming[0] if upcoming else None
+    if windows[0].window != window:
+        return [], next_window
+
+    chats = query.filter(models.Chat.id.between(windows[0].first_chat_id, windows[0].last_chat_id)).all()
+    return chats, next_window
@@ -0,0 +1,193 @@
+# ./retention.py
+# python -m app.retention   -> create upcoming partitions and archive expired ones once
+import asyncio
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from app.config import settings
+from app.database import SessionLocal, engine
+
+RETENTION_LOCK_KEY = 12346
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ARCHIVE_SUFFIX = ".ndjson.zst"
+PARTITION_PREFIX = "chats_p"
+# the pre-partitioning table (app.migrations): everything from MINVALUE up
+# to the week the conversion ran
+LEGACY_PARTITION = "chats_legacy"
+
+
+def partition_bounds(moment: datetime) -> tuple[datetime, datetime]:
+    interval = timedelta(days=settings.chat_partition_days)
+    start = EPOCH + ((moment - EPOCH) // interval) * interval
+    return start, start + interval
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARTITION_PREFIX}{start:%Y%m%d}"
+
+
+def ensure_partitions(conn, now: datetime, since: Optional[datetime] = None):
+    # since reaches back for backfilled chats (app.seed); the default
+    # partition only catches what falls outside every range
+    conn.execute(text("CREATE TABLE IF NOT EXISTS chats_default PARTITION OF chats DEFAULT"))
+    start, end = partition_bounds(since or now)
+    last = partition_bounds(now)[0] + (end - start) * settings.chat_partitions_ahead
+    while start <= last:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF chats "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        start, end = end, end + (end - start)
+
+
+def partitions(conn) -> list[str]:
+    return conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = 'chats'
+        ORDER BY child.relname
+    """)).scalars().all()
+
+
+def partition_upper_bound(conn, name: str) -> Optional[datetime]:
+    # "FOR VALUES FROM (MINVALUE) TO ('2024-01-04 00:00:00+00')"
+    bound = conn.execute(
+        text("SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": name}
+    ).scalar()
+    match = re.search(r"TO \('([^']+)'\)", bound or "")
+    return datetime.fromisoformat(match.group(1)) if match else None
+
+
+def expired_partitions(conn, now: datetime) -> list[tuple[str, datetime]]:
+    cutoff = now - timedelta(days=settings.chat_retention_days)
+    expired = []
+    for name in partitions(conn):
+        if name == LEGACY_PARTITION:
+            end = partition_upper_bound(conn, name)
+            if end is not None and end <= cutoff:
+                # archived as if it started at the epoch, so its files sort
+                # before every week's
+                expired.append((name, EPOCH))
+            continue
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        start = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").replace(tzinfo=timezone.utc)
+        if partition_bounds(start)[1] <= cutoff:
+            expired.append((name, start))
+    return sorted(expired, key=lambda partition: partition[1])
+
+
+def archive_path(stream_id: int, start: datetime) -> str:
+    return os.path.join(settings.chat_archive_dir, str(stream_id), f"{start:%Y%m%d}{ARCHIVE_SUFFIX}")
+
+
+def archive_partition(name: str, start: datetime) -> int:
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=settings.chat_archive_zstd_level)
+    archived = 0
+    current_stream = None
+    writer = None
+    tmp_path = None
+
+    def finish():
+        writer.close()
+        os.replace(tmp_path, archive_path(current_stream, start))
+
+    with SessionLocal() as db:
+        rows = db.execute(text(f"""
+            SELECT c.id, c.stream_id, c.user_id, u.username, c.message, c.timestamp
+            FROM {name} c
+            LEFT JOIN users u ON u.id = c.user_id
+            ORDER BY c.stream_id, c.id
+        """).execution_options(yield_per=settings.chat_archive_chunk_size))
+
+        for row in rows:
+            if row.stream_id != current_stream:
+                if writer is not None:
+                    finish()
+                current_stream = row.stream_id
+                os.makedirs(os.path.dirname(archive_path(current_stream, start)), exist_ok=True)
+                tmp_path = archive_path(current_stream, start) + ".tmp"
+                writer = compressor.stream_writer(open(tmp_path, "wb"), closefd=True)
+
+            writer.write((json.dumps({
+                "id": row.id,
+                "user_id": row.user_id,
+                "username": row.username,
+                "message": row.message,
+                "timestamp": row.timestamp.isoformat(),
+            }) + "\n").encode())
+            archived += 1
+
+    if writer is not None:
+        finish()
+    return archived
+
+
+def drop_partition(name: str):
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE chats DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+
+
+def run_retention_once(now: Optional[datetime] = None) -> list[tuple[str, int]]:
+    now = now or datetime.now(timezone.utc)
+    done = []
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": RETENTION_LOCK_KEY}).scalar():
+            return done
+        try:
+            with engine.begin() as conn:
+                ensure_partitions(conn, now)
+                expired = expired_partitions(conn, now)
+
+            for name, start in expired:
+                archived = archive_partition(name, start)
+                drop_partition(name)
+                print(f"Archived {archived} chats from {name}")
+                done.append((name, archived))
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": RETENTION_LOCK_KEY})
+    return done
+
+
+async def run_retention():
+    while True:
+        try:
+            await run_in_threadpool(run_retention_once)
+        except Exception as e:
+            print(f"Chat retention failed: {e}")
+        await asyncio.sleep(settings.chat_retention_interval_seconds)
+
+
+def read_archive(stream_id: int) -> Iterator[bytes]:
+    import zstandard
+
+    directory = os.path.join(settings.chat_archive_dir, str(stream_id))
+    if not os.path.isdir(directory):
+        return
+    decompressor = zstandard.ZstdDecompressor()
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(ARCHIVE_SUFFIX):
+            continue
+        with open(os.path.join(directory, filename), "rb") as f:
+            for chunk in decompressor.read_to_iter(f):
+                yield chunk
+
+
+def has_archive(stream_id: int) -> bool:
+    directory = os.path.join(settings.chat_archive_dir, str(stream_id))
+    return os.path.isdir(directory) and any(name.endswith(ARCHIVE_SUFFIX) for name in os.listdir(directory))
+
+
+if __name__ == "__main__":
+    for name, archived in run_retention_once():
+        print(f"{name}: {archived} chats archived")
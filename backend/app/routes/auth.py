@@ -1,13 +1,13 @@
 # ./routes/auth.py
-from fastapi import status, Depends, HTTPException, APIRouter
+from fastapi import status, BackgroundTasks, Depends, HTTPException, APIRouter
+from fastapi.responses import JSONResponse
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from passlib.context import CryptContext
-from app import models, schemas
+from app import deletion, models, schemas
 from app.database import get_db
 from app.routes import oauth2
-from app.routes.upload import delete_old_file
 
 router = APIRouter(
     prefix="/auth",
@@ -87,18 +87,26 @@ def update_user(
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(oauth2.get_current_user)
 ):
-    
-    if current_user.profile_picture:
-        delete_old_file(current_user.profile_picture)
-    
-    user_streams = db.query(models.Stream).filter(models.Stream.user_id == current_user.id).all()
-    for stream in user_streams:
-        if stream.thumbnail:
-            delete_old_file(stream.thumbnail)
+    if deletion.is_large(db, deletion.USER, current_user.id):
+        job = deletion.create_job(db, deletion.USER, current_user.id)
+        background_tasks.add_task(deletion.run_job, job.id)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=schemas.DeletionJobResponse.model_validate(job).model_dump(mode="json")
+        )
 
-    db.delete(current_user)
-    db.commit()
+    deletion.delete_now(db, deletion.USER, current_user.id)
     return
+
+@router.get("/deletion-jobs/{job_id}", response_model=schemas.DeletionJobResponse)
+def get_deletion_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.query(models.DeletionJob).filter(models.DeletionJob.id == job_id).first()
+
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Deletion job not found")
+
+    return job
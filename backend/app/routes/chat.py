@@ -1,28 +1,135 @@
 # ./routes/chat.py
 import json
-from fastapi import Query, status, Depends, HTTPException, APIRouter, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from app import models, schemas
-from app.database import SessionLocal, get_db
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Optional
+from fastapi import Query, Response, status, Depends, HTTPException, APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, joinedload
+from app import framing, models, schemas
+from app.analytics import collector
+from app.batching import ChatBatcher
+from app.config import settings
+from app.connections import Connection, ConnectionRegistry
+from app.database import SessionLocal, get_db, get_read_db
+from app.emotes import current_catalog, get_catalog
+from app.heartbeat import heartbeat
+from app.metrics import CHAT_BROADCAST_SECONDS, CHAT_PERSIST_SECONDS, registry as metrics
+from app.moderation import moderation
+from app.multiplex import CHAT, hub
+from app.notifications import notifications, notify
+from app.profiler import profiler
+from app.ratelimit import flood_control
+from app.replay import replay_window
+from app.retention import has_archive, read_archive
+from app.search import SEARCH_CONFIG
+from app.trending import trending
 from app.routes import oauth2
 
 router = APIRouter(
     tags=["Chats"]
 )
 
+SEARCH_PAGE_SIZE = 50
+MAX_SEARCH_PAGE_SIZE = 200
+CHAT_MESSAGE_PROFILE = "WS /ws/streams/{stream_id}/chat message"
+
 
 @router.get("/streams/{stream_id}/chat", response_model=list[schemas.ChatResponse])
-def get_chat_history(stream_id: int, db: Session = Depends(get_db)):
+def get_chat_history(stream_id: int, db: Session = Depends(get_read_db)):
     stream = db.query(models.Stream).filter(models.Stream.id == stream_id).first()
     if not stream:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
 
+    # the latest messages, oldest first; clients resume the socket from the
+    # last id in this list
     chats = (
         db.query(models.Chat)
+        .options(joinedload(models.Chat.user))
         .filter(models.Chat.stream_id == stream_id)
-        .order_by(models.Chat.timestamp.asc())
-        .limit(100).offset(0)
+        .order_by(models.Chat.id.desc())
+        .limit(100)
+        .all()
+    )
+    return chats[::-1]
+
+@router.get("/streams/{stream_id}/chat/replay", response_model=schemas.ChatReplayResponse)
+def get_chat_replay(
+    stream_id: int,
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
+):
+    stream = db.query(models.Stream).filter(models.Stream.id == stream_id).first()
+    if not stream:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
+
+    if not stream.started_at:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream has never been live")
+
+    window_seconds = settings.chat_replay_window_seconds
+    window = offset // window_seconds
+    chats, next_window = replay_window(db, stream, window)
+
+    return {
+        "stream_id": stream.id,
+        "started_at": stream.started_at,
+        "offset": window * window_seconds,
+        "window_seconds": window_seconds,
+        "next_offset": next_window * window_seconds if next_window is not None else None,
+        "messages": chats,
+    }
+
+@router.get("/streams/{stream_id}/chat/archive")
+def get_chat_archive(stream_id: int):
+    if not has_archive(stream_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No archived chat for this stream")
+
+    return StreamingResponse(read_archive(stream_id), media_type="application/x-ndjson")
+
+@router.get("/chats/search", response_model=list[schemas.ChatResponse])
+def search_chat(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    stream_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
+):
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    query = db.query(models.Chat).options(joinedload(models.Chat.user)).filter(
+        or_(
+            models.Chat.search_vector.op("@@")(ts_query),
+            and_(
+                models.Chat.search_vector.is_(None),
+                func.to_tsvector(SEARCH_CONFIG, models.Chat.message).op("@@")(ts_query)
+            )
+        )
     )
+
+    if stream_id is not None:
+        query = query.filter(models.Chat.stream_id == stream_id)
+    if user_id is not None:
+        query = query.filter(models.Chat.user_id == user_id)
+    if since is not None:
+        query = query.filter(models.Chat.timestamp >= since)
+    if until is not None:
+        query = query.filter(models.Chat.timestamp < until)
+    if cursor is not None:
+        query = query.filter(models.Chat.id < cursor)
+
+    chats = query.order_by(models.Chat.id.desc()).limit(limit + 1).all()
+
+    if len(chats) > limit:
+        chats = chats[:limit]
+        response.headers["X-Next-Cursor"] = str(chats[-1].id)
+
     return chats
 
 @router.delete("/chats/{chat_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -48,62 +155,281 @@ def delete_chat_message(
         )
 
     db.delete(chat)
+    # every worker drops it from its replay log, this one included
+    notify(db, CHAT_DELETE_CHANNEL, {"stream_id": chat.stream_id, "chat_id": chat.id})
     db.commit()
     return {"detail": "Chat deleted successfully"}
 
 
 
 
+@router.put("/streams/{stream_id}/chat/slow-mode", response_model=schemas.SlowModeResponse)
+def set_slow_mode(
+    stream_id: int,
+    slow_mode: schemas.SlowModeUpdate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    stream = db.query(models.Stream).filter(models.Stream.id == stream_id).first()
+
+    if not stream:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
+
+    if stream.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not authorized to change slow mode for this stream"
+        )
+
+    stream.slow_mode_seconds = slow_mode.seconds
+    db.commit()
+
+    flood_control.set_slow_mode(stream_id, slow_mode.seconds)
+    return {"stream_id": stream_id, "seconds": slow_mode.seconds}
+
+
 # websocet 
 
+BAN_CHANNEL = "chat_ban"
+CHAT_DELETE_CHANNEL = "chat_deleted"
+
+class BanCache:
+    # a streamer's bans are loaded once per worker and then kept current by
+    # the ban events every worker receives; a listener reconnect clears the
+    # lot since events may have been missed meanwhile
+    def __init__(self):
+        self.banned_users: dict[int, set[int]] = {}
+
+    def _load(self, db: Session, streamer_id: int) -> set[int]:
+        rows = db.query(models.ChatBan.banned_user_id).filter(
+            models.ChatBan.streamer_id == streamer_id
+        ).all()
+        banned = {user_id for user_id, in rows}
+        self.banned_users[streamer_id] = banned
+        return banned
+
+    def is_banned(self, db: Session, streamer_id: int, user_id: int) -> bool:
+        banned = self.banned_users.get(streamer_id)
+        if banned is None:
+            banned = self._load(db, streamer_id)
+        return user_id in banned
+
+    def add(self, streamer_id: int, user_id: int):
+        if streamer_id in self.banned_users:
+            self.banned_users[streamer_id].add(user_id)
+
+    def remove(self, streamer_id: int, user_id: int):
+        if streamer_id in self.banned_users:
+            self.banned_users[streamer_id].discard(user_id)
+
+    def clear(self):
+        self.banned_users.clear()
+
+ban_cache = BanCache()
+
+class ChatLog:
+    def __init__(self, size: int):
+        self.size = size
+        self.streams: dict[int, deque[dict]] = {}
+
+    def append(self, stream_id: int, data: dict):
+        log = self.streams.get(stream_id)
+        if log is None:
+            log = self.streams[stream_id] = deque(maxlen=self.size)
+        log.append(data)
+
+    def since(self, stream_id: int, last_seen_id: int) -> Optional[list[dict]]:
+        # ids are shared by every stream, so the log only covers the gap when it
+        # still holds the client's last message (or something older)
+        log = self.streams.get(stream_id)
+        if not log or log[0]["id"] > last_seen_id:
+            return None
+        if log[-1]["id"] <= last_seen_id:
+            return []
+        return [data for data in log if data["id"] > last_seen_id]
+
+    def remove(self, stream_id: int, chat_id: int):
+        log = self.streams.get(stream_id)
+        if log is None:
+            return
+        for data in log:
+            if data["id"] == chat_id:
+                log.remove(data)
+                return
+
+    def forget(self, stream_id: int):
+        self.streams.pop(stream_id, None)
+
+    def clear(self):
+        self.streams.clear()
+
+def chat_since(stream_id: int, last_seen_id: int, limit: int) -> list[dict]:
+    with SessionLocal() as db:
+        rows = db.query(
+            models.Chat.id,
+            models.Chat.user_id,
+            models.User.username,
+            models.Chat.message,
+            models.Chat.timestamp
+        ).join(
+            models.User,
+            models.User.id == models.Chat.user_id
+        ).filter(
+            models.Chat.stream_id == stream_id,
+            models.Chat.id > last_seen_id
+        ).order_by(
+            models.Chat.id.desc()
+        ).limit(limit).all()
+
+    emote_catalog = get_catalog()
+    return [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "username": row.username,
+            "message": row.message,
+            "emotes": emote_catalog.tokenize(row.message),
+            "timestamp": row.timestamp.isoformat(),
+        }
+        for row in reversed(rows)
+    ]
+
+def load_slow_mode(stream_id: int):
+    with SessionLocal() as db:
+        seconds = db.query(models.Stream.slow_mode_seconds).filter(models.Stream.id == stream_id).scalar()
+    flood_control.set_slow_mode(stream_id, seconds or 0)
+
+def reconnect_hint() -> dict:
+    # spread reconnects out so a restart does not bring every client back at once
+    return {
+        "type": "reconnect",
+        "data": {"delay_ms": random.randint(settings.chat_reconnect_min_ms, settings.chat_reconnect_max_ms)}
+    }
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: dict[int, list[tuple[WebSocket, int]]] = {}
+        self.registry = ConnectionRegistry()
+        self.log = ChatLog(settings.chat_replay_buffer_size)
+        self.batcher = ChatBatcher(
+            self.broadcast,
+            settings.chat_batch_window_ms,
+            settings.chat_batch_threshold
+        )
 
-    async def connect(self, stream_id: int, websocket: WebSocket, user_id: int):
+    async def connect(self, stream_id: int, streamer_id: int, websocket: WebSocket, user_id: int, encoding: str) -> Connection:
         await websocket.accept()
-        if stream_id not in self.active_connections:
-            self.active_connections[stream_id] = []
-        self.active_connections[stream_id].append((websocket, user_id))
-
-    def disconnect(self, stream_id: int, websocket: WebSocket):
-        if stream_id in self.active_connections:
-            # Find and remove the exact (websocket, user_id) tuple
-            connection_to_remove = None
-            for connection in self.active_connections[stream_id]:
-                if connection[0] == websocket:
-                    connection_to_remove = connection
-                    break
-            
-            if connection_to_remove:
-                self.active_connections[stream_id].remove(connection_to_remove)
-                
-            if not self.active_connections[stream_id]:
-                del self.active_connections[stream_id]
-    # def disconnect(self, stream_id: int, websocket: WebSocket):
-    #     self.active_connections[stream_id].remove((websocket, next(uid for ws, uid in self.active_connections[stream_id] if ws == websocket)))
-    #     if not self.active_connections[stream_id]:
-    #         del self.active_connections[stream_id]
+        connection = self.registry.add(websocket, stream_id, user_id, streamer_id, encoding)
+        heartbeat.track(connection)
+        return connection
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.registry.remove(websocket)
+        if connection is not None:
+            heartbeat.untrack(connection)
+            if not self.registry.stream_count(connection.stream_id):
+                self.batcher.forget(connection.stream_id)
+
+    async def publish(self, stream_id: int, message: dict):
+        self.log.append(stream_id, message["data"])
+        collector.record_message(stream_id, message["data"]["user_id"])
+        trending.record_message(stream_id)
+        await self.batcher.publish(stream_id, message)
+
+    async def replay(self, connection: Connection, last_seen_id: int):
+        missed = self.log.since(connection.stream_id, last_seen_id)
+        if missed is None:
+            missed = await run_in_threadpool(
+                chat_since,
+                connection.stream_id,
+                last_seen_id,
+                settings.chat_replay_db_limit
+            )
+        if missed:
+            await framing.send(connection.websocket, {"type": "chat_batch", "data": missed}, connection.encoding)
+
+    async def close_all(self, code: int = 1012):
+        for connection in list(self.registry.connections.values()):
+            self.disconnect(connection.websocket)
+            try:
+                await framing.send(connection.websocket, reconnect_hint(), connection.encoding)
+                await connection.websocket.close(code=code)
+            except Exception:
+                pass
 
     async def broadcast(self, stream_id: int, message: dict):
-        if stream_id in self.active_connections:
-            for websocket, _ in self.active_connections[stream_id]:
-                await websocket.send_json(message)
-
-    async def disconnect_banned_user(self, db: Session, streamer_id: int, banned_user_id: int):
-        from ..models import Stream
-        streams = db.query(Stream).filter(Stream.user_id == streamer_id).all()
-        for stream in streams:
-            if stream.id in self.active_connections:
-                for websocket, user_id in list(self.active_connections[stream.id]):
-                    if user_id == banned_user_id:
-                        await websocket.close(code=1008)
-                        self.active_connections[stream.id].remove((websocket, user_id))
+        start = time.perf_counter()
+        await hub.publish((CHAT, stream_id), message)
+
+        frames = framing.FrameCache(message)
+        for connection in self.registry.stream(stream_id):
+            try:
+                await framing.send_frame(connection.websocket, frames.get(connection.encoding))
+            except Exception:
+                self.disconnect(connection.websocket)
+        CHAT_BROADCAST_SECONDS.observe(time.perf_counter() - start)
+
+    async def disconnect_banned_user(self, streamer_id: int, banned_user_id: int, stream_ids: list[int]):
+        for stream_id in self.registry.streams_of(streamer_id):
+            for connection in self.registry.user(stream_id, banned_user_id):
+                self.disconnect(connection.websocket)
+                try:
+                    await connection.websocket.close(code=1008)
+                except RuntimeError:
+                    pass
+
+        # multiplex sockets carry other topics too, so only the chat goes
+        for stream_id in stream_ids:
+            for subscriber in hub.unsubscribe_user((CHAT, stream_id), banned_user_id):
+                try:
+                    await framing.send(subscriber.websocket, {
+                        "type": "unsubscribed",
+                        "data": {"streams": [stream_id], "topics": [CHAT], "reason": "banned"}
+                    }, subscriber.encoding)
+                except Exception:
+                    hub.remove(subscriber.websocket)
 
 manager = ConnectionManager()
 
+async def on_ban_event(event: dict):
+    if event["banned"]:
+        ban_cache.add(event["streamer_id"], event["user_id"])
+        await manager.disconnect_banned_user(event["streamer_id"], event["user_id"], event["stream_ids"])
+    else:
+        ban_cache.remove(event["streamer_id"], event["user_id"])
+
+async def on_chat_deleted(event: dict):
+    manager.log.remove(event["stream_id"], event["chat_id"])
+
+notifications.handle(BAN_CHANNEL, on_ban_event, ban_cache.clear)
+# a log that may hold a deletion it never heard of is dropped; replays go to
+# the database until it fills again
+notifications.handle(CHAT_DELETE_CHANNEL, on_chat_deleted, manager.log.clear)
+
+metrics.gauge_func(
+    "chat_sockets", "Open chat sockets per stream.", ("stream_id",),
+    lambda: {(str(stream_id),): len(connections) for stream_id, connections in list(manager.registry.by_stream.items())}
+)
+metrics.counter_func(
+    "chat_batch_frames_total", "Chat frames sent by the batcher, single or batched.", (),
+    lambda: {(): manager.batcher.frames_sent}
+)
+metrics.counter_func(
+    "chat_batched_messages_total", "Chat messages delivered inside batch frames.", (),
+    lambda: {(): manager.batcher.messages_batched}
+)
+metrics.counter_func(
+    "chat_messages_dropped_total", "Chat messages rejected by flood control.", (),
+    lambda: {(): flood_control.dropped}
+)
+
 @router.websocket("/ws/streams/{stream_id}/chat")
-async def websocket_chat(websocket: WebSocket, stream_id: int, token: str = Query(...)):
+async def websocket_chat(
+    websocket: WebSocket,
+    stream_id: int,
+    token: str = Query(...),
+    encoding: Optional[str] = Query(None),
+    last_seen_id: Optional[int] = Query(None)
+):
     db = SessionLocal()
     try:
         current_user = await oauth2.get_current_user_ws(token, db)
@@ -118,56 +444,96 @@ async def websocket_chat(websocket: WebSocket, stream_id: int, token: str = Quer
         await websocket.close(code=1008)
         return
 
-    banned = db.query(models.ChatBan).filter(
-        models.ChatBan.streamer_id == stream.user_id,
-        models.ChatBan.banned_user_id == current_user.id
-    ).first()
-    if banned:
+    if ban_cache.is_banned(db, stream.user_id, current_user.id):
         db.close()
         await websocket.close(code=1008)
         return
 
+    streamer_id = stream.user_id
+    flood_control.set_slow_mode(stream_id, stream.slow_mode_seconds)
     db.close()
+    await moderation.ensure(streamer_id)
 
-    await manager.connect(stream_id, websocket, current_user.id)
+    encoding = framing.negotiate(encoding)
+    connection = await manager.connect(stream_id, streamer_id, websocket, current_user.id, encoding)
 
     try:
-        while True:
-            data = await websocket.receive_json()
-            message_text = data.get("data", {}).get("message", "").strip()
+        if last_seen_id is not None:
+            await manager.replay(connection, last_seen_id)
 
-            if not message_text:
+        while True:
+            data = await framing.receive(websocket, encoding)
+            heartbeat.touch(connection)
+            if data.get("type") == "pong":
                 continue
 
-            db = SessionLocal()
-            try:
-                new_chat = models.Chat(
-                    stream_id=stream_id,
-                    user_id=current_user.id,
-                    message=message_text
+            with profiler.profile(CHAT_MESSAGE_PROFILE):
+                message_text = data.get("data", {}).get("message", "").strip()
+
+                if not message_text:
+                    continue
+
+                if flood_control.slow_mode_due(stream_id):
+                    await run_in_threadpool(load_slow_mode, stream_id)
+
+                reason, retry_after = flood_control.check(
+                    stream_id,
+                    current_user.id,
+                    exempt=current_user.id == streamer_id
                 )
-                db.add(new_chat)
-                db.commit()
-                db.refresh(new_chat)
-            finally:
-                db.close()
-
-            await manager.broadcast(
-                stream_id,
-                {
-                    "type": "chat_message",
-                    "data": {
-                        "id": new_chat.id,
-                        "user_id": current_user.id,
-                        "username": current_user.username,
-                        "message": message_text,
-                        "timestamp": new_chat.timestamp.isoformat(),
+                if reason:
+                    await framing.send(websocket, {
+                        "type": "error",
+                        "data": {
+                            "code": reason,
+                            "retry_after": round(retry_after, 2),
+                        }
+                    }, encoding)
+                    continue
+
+                await moderation.ensure(streamer_id)
+                if moderation.search(streamer_id, message_text):
+                    await framing.send(websocket, {
+                        "type": "error",
+                        "data": {"code": "blocked_term"}
+                    }, encoding)
+                    continue
+
+                emote_catalog = current_catalog()
+
+                db = SessionLocal()
+                try:
+                    with CHAT_PERSIST_SECONDS.time():
+                        new_chat = models.Chat(
+                            stream_id=stream_id,
+                            user_id=current_user.id,
+                            message=message_text
+                        )
+                        db.add(new_chat)
+                        db.commit()
+                        db.refresh(new_chat)
+                finally:
+                    db.close()
+
+                await manager.publish(
+                    stream_id,
+                    {
+                        "type": "chat_message",
+                        "data": {
+                            "id": new_chat.id,
+                            "user_id": current_user.id,
+                            "username": current_user.username,
+                            "message": message_text,
+                            "emotes": emote_catalog.tokenize(message_text),
+                            "timestamp": new_chat.timestamp.isoformat(),
+                        }
                     }
-                }
-            )
+                )
 
     except WebSocketDisconnect:
-        manager.disconnect(stream_id, websocket)
+        pass
+    finally:
+        manager.disconnect(websocket)
 
 # bans
 
@@ -191,10 +557,19 @@ async def ban_user(
         reason=ban_data.reason
     )
     db.add(new_ban)
+    stream_ids = [stream_id for stream_id, in db.query(models.Stream.id).filter(models.Stream.user_id == current_user.id).all()]
+    notify(db, BAN_CHANNEL, {
+        "streamer_id": current_user.id,
+        "user_id": ban_data.banned_user_id,
+        "banned": True,
+        "stream_ids": stream_ids
+    })
     db.commit()
     db.refresh(new_ban)
 
-    await manager.disconnect_banned_user(db, current_user.id, ban_data.banned_user_id)
+    # the other workers apply it when the event arrives
+    ban_cache.add(current_user.id, ban_data.banned_user_id)
+    await manager.disconnect_banned_user(current_user.id, ban_data.banned_user_id, stream_ids)
 
     return new_ban
 
@@ -214,7 +589,10 @@ def unban_user(
         raise HTTPException(status_code=404, detail="User is not banned")
 
     db.delete(ban)
+    notify(db, BAN_CHANNEL, {"streamer_id": current_user.id, "user_id": banned_user_id, "banned": False})
     db.commit()
+
+    ban_cache.remove(current_user.id, banned_user_id)
     return {"detail": "User unbanned successfully"}
 
 
@@ -225,3 +603,59 @@ def get_banned_users(
 ):
     bans = db.query(models.ChatBan).filter(models.ChatBan.streamer_id == current_user.id).all()
     return bans
+
+# blocked terms
+
+@router.get("/blocked-terms", response_model=list[schemas.BlockedTermResponse])
+def get_blocked_terms(
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    terms = db.query(models.BlockedTerm).filter(models.BlockedTerm.streamer_id == current_user.id).all()
+    return terms
+
+
+@router.post("/blocked-terms", response_model=schemas.BlockedTermResponse, status_code=status.HTTP_201_CREATED)
+def add_blocked_term(
+    term_data: schemas.BlockedTermCreate,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    term = term_data.term.strip().lower()
+
+    existing_term = db.query(models.BlockedTerm).filter(
+        models.BlockedTerm.streamer_id == current_user.id,
+        models.BlockedTerm.term == term
+    ).first()
+
+    if existing_term:
+        raise HTTPException(status_code=400, detail="Term already blocked")
+
+    new_term = models.BlockedTerm(streamer_id=current_user.id, term=term)
+    db.add(new_term)
+    db.commit()
+    db.refresh(new_term)
+
+    moderation.invalidate(current_user.id)
+    return new_term
+
+
+@router.delete("/blocked-terms/{term_id}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_blocked_term(
+    term_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(oauth2.get_current_user)
+):
+    term = db.query(models.BlockedTerm).filter(
+        models.BlockedTerm.id == term_id,
+        models.BlockedTerm.streamer_id == current_user.id
+    ).first()
+
+    if not term:
+        raise HTTPException(status_code=404, detail="Term not found")
+
+    db.delete(term)
+    db.commit()
+
+    moderation.invalidate(current_user.id)
+    return {"detail": "Term removed successfully"}
@@ -0,0 +1,21 @@
+# ./routes/emotes.py
+from fastapi import APIRouter, Header, Response
+from typing import Optional
+from app.emotes import get_catalog
+
+router = APIRouter(
+    tags=["Emotes"]
+)
+
+CACHE_CONTROL = "public, max-age=3600"
+
+
+@router.get("/emotes")
+def get_emotes(if_none_match: Optional[str] = Header(None)):
+    catalog = get_catalog()
+    headers = {"ETag": catalog.etag, "Cache-Control": CACHE_CONTROL}
+
+    if if_none_match == catalog.etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=catalog.payload, media_type="application/json", headers=headers)
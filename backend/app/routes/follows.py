@@ -1,15 +1,23 @@
 # ./routes/follows.py
-from fastapi import status, Depends, HTTPException, APIRouter
+import json
+from typing import Optional
+from fastapi import Query, Response, status, Depends, HTTPException, APIRouter
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app import models, schemas
-from app.database import get_db
+from app.database import get_db, get_read_db, read_session
 from app.routes import oauth2
+from app.trending import trending
 
 router = APIRouter(
     prefix="/users",
     tags=["Follows"]
 )
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+EXPORT_CHUNK_SIZE = 1000
+
 
 @router.post("/{user_id}/follow", response_model=schemas.FollowResponse, status_code=status.HTTP_201_CREATED)
 def follow_user(
@@ -49,6 +57,7 @@ def follow_user(
     db.add(new_follow)
     db.commit()
     db.refresh(new_follow)
+    trending.add_followers(user_id, 1)
 
     return new_follow
 
@@ -72,6 +81,7 @@ def unfollow_user(
 
     db.delete(follow)
     db.commit()
+    trending.add_followers(user_id, -1)
 
     return {"detail": "Successfully unfollowed user"}
 
@@ -91,7 +101,7 @@ def get_follow_status(
 @router.get("/{user_id}/followers/count")
 def get_followers_count(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     count = db.query(models.Follow).filter(
         models.Follow.followed_id == user_id
@@ -102,7 +112,7 @@ def get_followers_count(
 @router.get("/{user_id}/following/count")
 def get_following_count(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     count = db.query(models.Follow).filter(
         models.Follow.follower_id == user_id
@@ -110,30 +120,103 @@ def get_following_count(
 
     return {"count": count}
 
+def _follow_page(db: Session, user_column, filter_column, user_id: int, cursor: Optional[int], limit: int, response: Response):
+    query = db.query(models.User, models.Follow.id).join(
+        models.Follow,
+        user_column == models.User.id
+    ).filter(
+        filter_column == user_id
+    )
+
+    if cursor is not None:
+        query = query.filter(models.Follow.id < cursor)
+
+    rows = query.order_by(models.Follow.id.desc()).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1][1])
+
+    return [user for user, _ in rows]
+
+def _follow_export(user_column, filter_column, user_id: int):
+    db = read_session()
+    try:
+        rows = db.query(
+            models.User.id,
+            models.User.username,
+            models.User.email,
+            models.User.profile_picture,
+            models.User.created_at
+        ).join(
+            models.Follow,
+            user_column == models.User.id
+        ).filter(
+            filter_column == user_id
+        ).order_by(
+            models.Follow.id.desc()
+        ).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+        for row in rows:
+            yield json.dumps({
+                "id": row.id,
+                "username": row.username,
+                "email": row.email,
+                "profile_picture": row.profile_picture,
+                "created_at": row.created_at.isoformat(),
+            }) + "\n"
+    finally:
+        db.close()
+
+# stays on the primary: the sidebar refetches it right after a follow
 @router.get("/me/following", response_model=list[schemas.UserResponse])
 def get_following_users(
+    response: Response,
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user)
 ):
-    following = db.query(models.User).join(
-        models.Follow,
-        models.Follow.followed_id == models.User.id
-    ).filter(
-        models.Follow.follower_id == current_user.id
-    ).all()
+    return _follow_page(
+        db,
+        models.Follow.followed_id,
+        models.Follow.follower_id,
+        current_user.id,
+        cursor,
+        limit,
+        response
+    )
 
-    return following
+@router.get("/me/following/export")
+def export_following_users(
+    current_user: int = Depends(oauth2.get_current_user)
+):
+    return StreamingResponse(
+        _follow_export(models.Follow.followed_id, models.Follow.follower_id, current_user.id),
+        media_type="application/x-ndjson"
+    )
 
 @router.get("/{user_id}/followers", response_model=list[schemas.UserResponse])
 def get_user_followers(
     user_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    cursor: Optional[int] = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db)
 ):
-    followers = db.query(models.User).join(
-        models.Follow,
-        models.Follow.follower_id == models.User.id
-    ).filter(
-        models.Follow.followed_id == user_id
-    ).all()
+    return _follow_page(
+        db,
+        models.Follow.follower_id,
+        models.Follow.followed_id,
+        user_id,
+        cursor,
+        limit,
+        response
+    )
 
-    return followers
+@router.get("/{user_id}/followers/export")
+def export_user_followers(user_id: int):
+    return StreamingResponse(
+        _follow_export(models.Follow.follower_id, models.Follow.followed_id, user_id),
+        media_type="application/x-ndjson"
+    )
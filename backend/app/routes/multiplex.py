@@ -0,0 +1,108 @@
+# ./routes/multiplex.py
+from typing import Optional
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from app import framing, models
+from app.config import settings
+from app.database import SessionLocal
+from app.heartbeat import heartbeat
+from app.multiplex import CHAT, TOPICS, VIEWERS, Subscriber, hub
+from app.routes import oauth2
+from app.routes.chat import ban_cache
+from app.routes.stream import viewer_manager
+
+router = APIRouter(
+    tags=["Multiplex"]
+)
+
+
+def existing_streams(stream_ids: list[int], user_id: int) -> tuple[list[int], list[int]]:
+    # the streams that exist, and those of them whose chat the user is banned from
+    with SessionLocal() as db:
+        rows = db.query(models.Stream.id, models.Stream.user_id).filter(models.Stream.id.in_(stream_ids)).all()
+        banned = [stream_id for stream_id, streamer_id in rows if ban_cache.is_banned(db, streamer_id, user_id)]
+    return sorted(stream_id for stream_id, _ in rows), sorted(banned)
+
+
+def parse_request(data: dict) -> tuple[list[int], list[str]]:
+    stream_ids = [stream_id for stream_id in data.get("streams", []) if isinstance(stream_id, int)]
+    topics = [topic for topic in data.get("topics", sorted(TOPICS)) if topic in TOPICS]
+    return stream_ids, topics
+
+
+async def subscribe(subscriber: Subscriber, data: dict):
+    stream_ids, topics = parse_request(data)
+    requested = {(topic, stream_id) for topic in topics for stream_id in stream_ids} - subscriber.topics
+    if len(subscriber.topics) + len(requested) > settings.multiplex_max_topics:
+        await framing.send(subscriber.websocket, {
+            "type": "error",
+            "data": {"code": "too_many_subscriptions", "limit": settings.multiplex_max_topics}
+        }, subscriber.encoding)
+        return
+
+    stream_ids, banned = await run_in_threadpool(existing_streams, stream_ids, subscriber.user_id) if stream_ids else ([], [])
+    for stream_id in stream_ids:
+        for topic in topics:
+            if topic == CHAT and stream_id in banned:
+                continue
+            hub.subscribe(subscriber, (topic, stream_id))
+
+    await framing.send(subscriber.websocket, {
+        "type": "subscribed",
+        "data": {"streams": stream_ids, "topics": topics, "chat_banned": banned if CHAT in topics else []}
+    }, subscriber.encoding)
+
+    if VIEWERS in topics:
+        for stream_id in stream_ids:
+            await framing.send(subscriber.websocket, {
+                "type": "viewer_count_update",
+                "stream_id": stream_id,
+                "data": {"viewer_count": viewer_manager.viewer_count(stream_id)}
+            }, subscriber.encoding)
+
+
+async def unsubscribe(subscriber: Subscriber, data: dict):
+    stream_ids, topics = parse_request(data)
+    for stream_id in stream_ids:
+        for topic in topics:
+            hub.unsubscribe(subscriber, (topic, stream_id))
+
+    await framing.send(subscriber.websocket, {
+        "type": "unsubscribed",
+        "data": {"streams": stream_ids, "topics": topics}
+    }, subscriber.encoding)
+
+
+@router.websocket("/ws/multiplex")
+async def websocket_multiplex(
+    websocket: WebSocket,
+    token: str = Query(...),
+    encoding: Optional[str] = Query(None)
+):
+    with SessionLocal() as db:
+        try:
+            current_user = await oauth2.get_current_user_ws(token, db)
+        except Exception:
+            await websocket.close(code=1008)
+            return
+
+    await websocket.accept()
+    encoding = framing.negotiate(encoding)
+    subscriber = hub.add(websocket, current_user.id, encoding)
+    heartbeat.track(subscriber)
+
+    try:
+        while True:
+            data = await framing.receive(websocket, encoding)
+            heartbeat.touch(subscriber)
+
+            message_type = data.get("type")
+            if message_type == "subscribe":
+                await subscribe(subscriber, data.get("data", {}))
+            elif message_type == "unsubscribe":
+                await unsubscribe(subscriber, data.get("data", {}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.remove(websocket)
+        heartbeat.untrack(subscriber)
@@ -0,0 +1,40 @@
+# ./routes/notifications.py
+from typing import Optional
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from app import framing
+from app.database import SessionLocal
+from app.heartbeat import heartbeat
+from app.notifications import notifications
+from app.routes import oauth2
+
+router = APIRouter(
+    tags=["Notifications"]
+)
+
+
+@router.websocket("/ws/notifications")
+async def websocket_notifications(
+    websocket: WebSocket,
+    token: str = Query(...),
+    encoding: Optional[str] = Query(None)
+):
+    with SessionLocal() as db:
+        try:
+            current_user = await oauth2.get_current_user_ws(token, db)
+        except Exception:
+            await websocket.close(code=1008)
+            return
+
+    await websocket.accept()
+    encoding = framing.negotiate(encoding)
+    connection = notifications.connect(websocket, current_user.id, encoding)
+
+    try:
+        while True:
+            # clients only ever answer pings on this socket
+            await framing.receive(websocket, encoding)
+            heartbeat.touch(connection)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        notifications.disconnect(websocket)
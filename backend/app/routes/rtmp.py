@@ -1,10 +1,15 @@
 from datetime import datetime, timezone
 import os
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi import Form
 from sqlalchemy.orm import Session
 from app import models
 from app.database import get_db
+from app.metrics import RTMP_CALLBACK_SECONDS
+from app.replay import build_replay_index
+from app.routes.chat import manager as chat_manager
+from app.notifications import notifications
+from app.trending import trending
 
 router = APIRouter(
         prefix="/rtmp",
@@ -12,6 +17,7 @@ router = APIRouter(
     )
 
 @router.get("/auth-publish")
+@RTMP_CALLBACK_SECONDS.timed("auth_publish")
 async def auth_publish(name: str = Form(...), db: Session = Depends(get_db)):
     stream = db.query(models.Stream).filter(
         models.Stream.stream_key == name
@@ -23,24 +29,32 @@ async def auth_publish(name: str = Form(...), db: Session = Depends(get_db)):
     return {"status": "success"}
 
 @router.post("/on_publish")
+@RTMP_CALLBACK_SECONDS.timed("on_publish")
 async def on_publish(name: str = Form(...), db: Session = Depends(get_db)):
     stream = db.query(models.Stream).filter(models.Stream.stream_key == name).first()
     if stream:
         stream.is_live = True
         stream.started_at = datetime.now(timezone.utc)
         db.commit()
+        # the follower count and the fan-out to every worker run after the
+        # callback has answered the RTMP server
+        notifications.spawn(notifications.announce_go_live(stream.id, stream.user_id))
     else:
         raise HTTPException(status_code=403, detail="Invalid stream key")
 
     return {"status": "success"}
 
 @router.post("/on_publish_done")
-async def on_publish_done(name: str = Form(...), db: Session = Depends(get_db)):
+@RTMP_CALLBACK_SECONDS.timed("on_publish_done")
+async def on_publish_done(background_tasks: BackgroundTasks, name: str = Form(...), db: Session = Depends(get_db)):
     stream = db.query(models.Stream).filter(models.Stream.stream_key == name).first()
     if stream:
         stream.is_live = False
         stream.ended_at = datetime.now(timezone.utc)
         db.commit()
+        chat_manager.log.forget(stream.id)
+        background_tasks.add_task(build_replay_index, stream.id)
+        trending.forget(stream.id)
     else:
         raise HTTPException(status_code=403, detail="Invalid stream key")
 
@@ -1,29 +1,75 @@
 # ./routes/stream.py
+import asyncio
 import os
 import uuid
-from fastapi import Query, WebSocket, WebSocketDisconnect, status, Depends, HTTPException, APIRouter
-from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
-from app import schemas, models
-from app.database import get_db, SessionLocal
+from datetime import datetime
+from typing import Optional
+from fastapi import Query, WebSocket, WebSocketDisconnect, status, BackgroundTasks, Depends, HTTPException, APIRouter
+from fastapi.responses import JSONResponse, RedirectResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from app import deletion, framing, schemas, models
+from app.analytics import collector
+from app.config import settings
+from app.connections import Connection, ConnectionRegistry
+from app.database import get_db, get_read_db, SessionLocal
+from app.heartbeat import heartbeat
+from app.metrics import registry as metrics
+from app.multiplex import VIEWERS, hub
 from app.routes import oauth2
 from app.routes.upload import delete_old_file
+from app.trending import trending
 
 router = APIRouter(
     # prefix="/streams",
     tags=["Streams"]
 )
 
+VIEWER_COUNT_BROADCAST_SECONDS = 1
+
 class ViewerManager:
     def __init__(self):
         self.active_viewers: dict[int, set[int]] = {}
-        self.active_connections: dict[int, list[WebSocket]] = {}
+        self.registry = ConnectionRegistry()
+        self.pending_counts: set[int] = set()
+        # the loop only keeps weak references to tasks
+        self.count_broadcasts: set[asyncio.Task] = set()
+
+    def connect(self, stream_id: int, websocket: WebSocket, user_id: Optional[int], encoding: str) -> Connection:
+        connection = self.registry.add(websocket, stream_id, user_id, encoding=encoding)
+        heartbeat.track(connection)
+        return connection
+
+    def disconnect(self, websocket: WebSocket):
+        connection = self.registry.remove(websocket)
+        if connection is not None:
+            heartbeat.untrack(connection)
     
+    def viewer_count(self, stream_id: int) -> int:
+        return len(self.active_viewers.get(stream_id, ()))
+
+    def schedule_count_broadcast(self, stream_id: int):
+        # joins and leaves within the window collapse into one update
+        if stream_id in self.pending_counts:
+            return
+        self.pending_counts.add(stream_id)
+        task = asyncio.get_running_loop().create_task(self._broadcast_count_later(stream_id))
+        self.count_broadcasts.add(task)
+        task.add_done_callback(self.count_broadcasts.discard)
+
+    async def _broadcast_count_later(self, stream_id: int):
+        await asyncio.sleep(VIEWER_COUNT_BROADCAST_SECONDS)
+        self.pending_counts.discard(stream_id)
+        await self.broadcast_viewer_count(stream_id, self.viewer_count(stream_id))
+
     async def add_viewer(self, stream_id: int, user_id: int, db: Session):
         if stream_id not in self.active_viewers:
             self.active_viewers[stream_id] = set()
         
         self.active_viewers[stream_id].add(user_id)
+        self.schedule_count_broadcast(stream_id)
+        collector.record_viewers(stream_id, self.viewer_count(stream_id))
+        trending.record_viewers(stream_id, self.viewer_count(stream_id))
         
         stream = db.query(models.Stream).filter(models.Stream.id == stream_id).first()
         if stream:
@@ -46,6 +92,9 @@ class ViewerManager:
     async def remove_viewer(self, stream_id: int, user_id: int, db: Session):
         if stream_id in self.active_viewers and user_id in self.active_viewers[stream_id]:
             self.active_viewers[stream_id].remove(user_id)
+            self.schedule_count_broadcast(stream_id)
+            collector.record_viewers(stream_id, self.viewer_count(stream_id))
+            trending.record_viewers(stream_id, self.viewer_count(stream_id))
             
             stream = db.query(models.Stream).filter(models.Stream.id == stream_id).first()
             if stream:
@@ -62,29 +111,90 @@ class ViewerManager:
                 db.commit()
 
     async def broadcast_viewer_count(self, stream_id: int, viewer_count: int):
-        if stream_id in self.active_connections:
-            dead_connections = []
-            for websocket in self.active_connections[stream_id]:
-                try:
-                    await websocket.send_json({
-                        "type": "viewer_count_update",
-                        "data": {"viewer_count": viewer_count}
-                    })
-                except:
-                    dead_connections.append(websocket)
-            
-            for ws in dead_connections:
-                self.active_connections[stream_id].remove(ws)
+        message = {
+            "type": "viewer_count_update",
+            "data": {"viewer_count": viewer_count}
+        }
+        await hub.publish((VIEWERS, stream_id), message)
+
+        frames = framing.FrameCache(message)
+        for connection in self.registry.stream(stream_id):
+            try:
+                await framing.send_frame(connection.websocket, frames.get(connection.encoding))
+            except Exception:
+                self.disconnect(connection.websocket)
 
 viewer_manager = ViewerManager()
 
+metrics.gauge_func(
+    "viewer_sockets", "Open viewer sockets per stream.", ("stream_id",),
+    lambda: {(str(stream_id),): len(connections) for stream_id, connections in list(viewer_manager.registry.by_stream.items())}
+)
+
 
 @router.get("/streams/all", response_model=list[schemas.StreamResponse])
-def get_streams(db: Session = Depends(get_db)):
-    streams = db.query(models.Stream).filter(models.Stream.is_live == True).all()
+def get_streams(db: Session = Depends(get_read_db)):
+    streams = db.query(models.Stream).options(joinedload(models.Stream.owner)).filter(models.Stream.is_live == True).all()
 
     return streams
 
+@router.get("/streams/trending", response_model=list[schemas.StreamResponse])
+def get_trending_streams(
+    limit: int = Query(20, ge=1, le=settings.trending_max_k),
+    db: Session = Depends(get_read_db)
+):
+    stream_ids = trending.top(limit)
+    if not stream_ids:
+        return []
+
+    live_streams = (
+        db.query(models.Stream)
+        .options(joinedload(models.Stream.owner))
+        .filter(models.Stream.id.in_(stream_ids), models.Stream.is_live == True)
+        .all()
+    )
+    streams = {stream.id: stream for stream in live_streams}
+    ranked = []
+    for stream_id in stream_ids:
+        stream = streams.get(stream_id)
+        if stream is not None:
+            stream.viewer_count = viewer_manager.viewer_count(stream_id)
+            ranked.append(stream)
+    return ranked
+
+@router.get("/streams/{stream_id}/analytics", response_model=list[schemas.StreamMinuteStatsResponse])
+def get_stream_analytics(
+    stream_id: int,
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    db: Session = Depends(get_read_db)
+):
+    stream = db.query(models.Stream).filter(models.Stream.id == stream_id).first()
+
+    if not stream:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stream not found")
+
+    since = since or stream.started_at
+    until = until or (stream.ended_at if not stream.is_live else None)
+
+    # one row per worker and minute; each worker only sees its own sockets,
+    # so the stream's numbers are the sums (a chatter who switched workers
+    # within a minute counts once per worker)
+    stats = models.StreamMinuteStats
+    query = db.query(
+        stats.minute,
+        func.sum(stats.peak_viewers).label("peak_viewers"),
+        func.sum(stats.viewer_seconds).label("viewer_seconds"),
+        func.sum(stats.messages).label("messages"),
+        func.sum(stats.unique_chatters).label("unique_chatters")
+    ).filter(stats.stream_id == stream_id)
+    if since is not None:
+        query = query.filter(stats.minute >= since)
+    if until is not None:
+        query = query.filter(stats.minute <= until)
+
+    return query.group_by(stats.minute).order_by(stats.minute.asc()).all()
+
 @router.get("/streams/{stream_id}", response_model=schemas.StreamResponse)
 def get_stream(stream_id: int, db: Session = Depends(get_db)):
     stream = db.query(models.Stream).filter(models.Stream.id == stream_id).first()
@@ -157,6 +267,7 @@ def update_stream(
 @router.delete("/streams/{stream_id}")
 def delete_stream(
     stream_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user)
 ):
@@ -168,11 +279,15 @@ def delete_stream(
     if stream.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this stream")
     
-    if stream.thumbnail:
-        delete_old_file(stream.thumbnail)
-    
-    db.delete(stream)
-    db.commit()
+    if deletion.is_large(db, deletion.STREAM, stream.id):
+        job = deletion.create_job(db, deletion.STREAM, stream.id)
+        background_tasks.add_task(deletion.run_job, job.id)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=schemas.DeletionJobResponse.model_validate(job).model_dump(mode="json")
+        )
+
+    deletion.delete_now(db, deletion.STREAM, stream.id)
     
     return {"message": "Stream deleted successfully"}
 
@@ -180,7 +295,8 @@ def delete_stream(
 async def websocket_viewer_tracking(
     websocket: WebSocket,
     stream_id: int,
-    token: str = Query(None)
+    token: str = Query(None),
+    encoding: Optional[str] = Query(None)
 ):
     current_user = None
     if token:
@@ -197,21 +313,29 @@ async def websocket_viewer_tracking(
             return
 
     await websocket.accept()
+    encoding = framing.negotiate(encoding)
+    connection = viewer_manager.connect(stream_id, websocket, current_user.id if current_user else None, encoding)
 
-    if current_user:
-        with SessionLocal() as db:
-            await viewer_manager.add_viewer(stream_id, current_user.id, db)
+    try:
+        if current_user:
+            with SessionLocal() as db:
+                await viewer_manager.add_viewer(stream_id, current_user.id, db)
 
-    viewer_count = len(viewer_manager.active_viewers.get(stream_id, set()))
-    await websocket.send_json({
-        "type": "viewer_count_update",
-        "data": {"viewer_count": viewer_count}
-    })
+        viewer_count = len(viewer_manager.active_viewers.get(stream_id, set()))
+        await framing.send(websocket, {
+            "type": "viewer_count_update",
+            "data": {"viewer_count": viewer_count}
+        }, encoding)
 
-    try:
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            heartbeat.touch(connection)
     except WebSocketDisconnect:
+        pass
+    finally:
+        viewer_manager.disconnect(websocket)
         if current_user:
             with SessionLocal() as db:
                 await viewer_manager.remove_viewer(stream_id, current_user.id, db)
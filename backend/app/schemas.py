@@ -1,7 +1,8 @@
 #./schemas.py
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, EmailStr, computed_field
+from pydantic import BaseModel, EmailStr, Field, computed_field
+from app.emotes import get_catalog
 
 # USER
 class UserBase(BaseModel):
@@ -68,6 +69,7 @@ class StreamResponse(StreamBase):
     viewer_count: Optional[int] = 0
     started_at: Optional[datetime] = None
     ended_at: Optional[datetime] = None
+    slow_mode_seconds: int = 0
     owner: UserResponse
 
     class Config:
@@ -99,6 +101,25 @@ class ChatResponse(ChatBase):
     class Config:
         from_attributes = True
 
+    @computed_field
+    @property
+    def emotes(self) -> list[tuple[int, int]]:
+        return get_catalog().tokenize(self.message)
+
+class ChatReplayResponse(BaseModel):
+    stream_id: int
+    started_at: datetime
+    offset: int
+    window_seconds: int
+    next_offset: Optional[int] = None
+    messages: list[ChatResponse]
+
+class SlowModeUpdate(BaseModel):
+    seconds: int = Field(ge=0, le=3600)
+
+class SlowModeResponse(SlowModeUpdate):
+    stream_id: int
+
 class FollowResponse(BaseModel):
     follower_id: int
     followed_id: int
@@ -107,6 +128,34 @@ class FollowResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class StreamMinuteStatsResponse(BaseModel):
+    minute: datetime
+    peak_viewers: int
+    viewer_seconds: float
+    messages: int
+    unique_chatters: int
+
+    @computed_field
+    @property
+    def avg_viewers(self) -> float:
+        return round(self.viewer_seconds / 60, 2)
+
+    class Config:
+        from_attributes = True
+
+class DeletionJobResponse(BaseModel):
+    id: str
+    target_type: str
+    target_id: int
+    status: str
+    deleted_rows: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class ChatBanBase(BaseModel):
     banned_user_id: int
     reason: Optional[str] = None
@@ -117,3 +166,14 @@ class ChatBanResponse(ChatBanBase):
 
     class Config:
         from_attributes = True
+
+class BlockedTermCreate(BaseModel):
+    term: str = Field(min_length=1, max_length=100)
+
+class BlockedTermResponse(BlockedTermCreate):
+    id: int
+    streamer_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
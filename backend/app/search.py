@@ -0,0 +1,41 @@
+# ./search.py
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from app.config import settings
+from app.database import SessionLocal
+
+SEARCH_CONFIG = "simple"
+
+# SKIP LOCKED lets every worker run the indexer without fighting over rows
+INDEX_PENDING_CHATS = text(f"""
+    UPDATE chats
+    SET search_vector = to_tsvector('{SEARCH_CONFIG}', message)
+    WHERE id IN (
+        SELECT id FROM chats
+        WHERE search_vector IS NULL
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+""")
+
+
+def index_pending_chats(batch_size: int) -> int:
+    with SessionLocal() as db:
+        result = db.execute(INDEX_PENDING_CHATS, {"batch_size": batch_size})
+        db.commit()
+        return result.rowcount
+
+
+async def run_indexer():
+    while True:
+        try:
+            indexed = await run_in_threadpool(index_pending_chats, settings.chat_search_batch_size)
+        except Exception as e:
+            print(f"Chat search indexer failed: {e}")
+            indexed = 0
+
+        # keep going while there is a backlog, otherwise wait for new chats
+        if indexed < settings.chat_search_batch_size:
+            await asyncio.sleep(settings.chat_search_interval_seconds)
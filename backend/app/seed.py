@@ -0,0 +1,305 @@
+# ./seed.py
+# python -m app.seed --users 1000000 --streams 20000 --chats 100000000 --seed 42
+# Generates a production-sized synthetic dataset and loads it with COPY in
+# parallel chunks. Every chunk draws from its own Random(seed, table, chunk)
+# and ids are assigned up front from the tables' current maximum, so a
+# given seed and --until produce the same rows however many workers load
+# them. Follow counts are heavy-tailed per user and Zipf-distributed across
+# streamers, and chat volume follows stream popularity. search_vector is
+# left NULL for app.search's indexer to backfill.
+import argparse
+import csv
+import io
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Iterable, Iterator, Optional
+from faker import Faker
+from passlib.context import CryptContext
+from sqlalchemy import text
+from app import retention
+from app.database import engine
+
+SEEDED_PASSWORD = "seeded-password"
+VOCABULARY_SIZE = 5000
+
+USER_COLUMNS = ("id", "username", "email", "hashed_password", "created_at")
+STREAM_COLUMNS = ("id", "user_id", "title", "description", "is_live", "started_at", "ended_at", "stream_key")
+FOLLOW_COLUMNS = ("id", "follower_id", "followed_id", "created_at")
+CHAT_COLUMNS = ("id", "stream_id", "user_id", "message", "timestamp")
+
+
+class Vocabulary:
+    # Faker is far too slow to call per row at this scale, so each worker
+    # builds the same seeded pools once and rows combine entries from them
+    def __init__(self, seed: int):
+        fake = Faker()
+        fake.seed_instance(seed)
+        self.usernames = [fake.user_name()[:30] for _ in range(VOCABULARY_SIZE)]
+        self.domains = [fake.free_email_domain() for _ in range(50)]
+        self.titles = [fake.catch_phrase()[:100] for _ in range(VOCABULARY_SIZE)]
+        self.descriptions = [fake.text(max_nb_chars=100) for _ in range(VOCABULARY_SIZE // 5)]
+        self.words = fake.words(VOCABULARY_SIZE)
+
+
+class SeedPlan:
+    def __init__(self, args, until: datetime, first_ids: dict[str, int]):
+        self.seed = args.seed
+        self.users = args.users
+        self.streams = args.streams
+        self.chats = args.chats
+        self.follows_per_user = args.follows_per_user
+        self.zipf = args.zipf
+        self.live_fraction = args.live_fraction
+        self.days = args.days
+        self.chunk_size = args.chunk_size
+        self.until = until
+        self.first_ids = first_ids
+        self.password_hash = ""
+        # stream i is owned by user i, and the lower the index the more
+        # popular the streamer
+        self.popularity = list(accumulate(1 / (rank + 1) ** args.zipf for rank in range(args.streams)))
+        self.follow_chunks: list[tuple[int, int]] = []
+        self.stream_starts = array("d")
+        self.stream_ends = array("d")
+        self.stream_live = bytearray()
+
+    def rng(self, table: str, chunk: int) -> random.Random:
+        return random.Random(f"{self.seed}:{table}:{chunk}")
+
+    def chunks(self, total: int) -> list[tuple[int, int]]:
+        return [(start, min(start + self.chunk_size, total)) for start in range(0, total, self.chunk_size)]
+
+    def follow_degrees(self, chunk: int, start: int, end: int) -> list[int]:
+        # Pareto out-degree with the requested mean; drawn from a separate
+        # stream so the parent can size every chunk before any is generated
+        rng = self.rng("follow-degree", chunk)
+        alpha = 1.5
+        scale = self.follows_per_user * (alpha - 1) / alpha
+        cap = max(0, self.streams // 2)
+        return [min(cap, int(rng.paretovariate(alpha) * scale)) for _ in range(start, end)]
+
+    def plan_follows(self):
+        offset = 0
+        for chunk, (start, end) in enumerate(self.chunks(self.users)):
+            count = sum(self.follow_degrees(chunk, start, end))
+            self.follow_chunks.append((offset, count))
+            offset += count
+
+    def plan_streams(self):
+        for chunk, (start, end) in enumerate(self.chunks(self.streams)):
+            rng = self.rng("stream-window", chunk)
+            for _ in range(start, end):
+                live = rng.random() < self.live_fraction
+                if live:
+                    started = self.until - timedelta(minutes=rng.uniform(1, 360))
+                    ended = self.until
+                else:
+                    started = self.until - timedelta(days=rng.uniform(0, self.days))
+                    ended = min(self.until, started + timedelta(minutes=rng.uniform(20, 480)))
+                self.stream_starts.append(started.timestamp())
+                self.stream_ends.append(ended.timestamp())
+                self.stream_live.append(live)
+
+    def popular_stream(self, rng: random.Random) -> int:
+        return bisect_left(self.popularity, rng.random() * self.popularity[-1])
+
+
+def copy_rows(table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> int:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    buffer.seek(0)
+
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        connection.commit()
+    finally:
+        connection.close()
+    return count
+
+
+def timestamp(seconds: float) -> str:
+    return datetime.fromtimestamp(seconds, timezone.utc).isoformat()
+
+
+def user_rows(plan: SeedPlan, vocabulary: Vocabulary, chunk: int, start: int, end: int) -> Iterator[tuple]:
+    rng = plan.rng("users", chunk)
+    first_id = plan.first_ids["users"]
+    newest = plan.until.timestamp()
+    for index in range(start, end):
+        user_id = first_id + index
+        username = f"{rng.choice(vocabulary.usernames)}{user_id}"
+        yield (
+            user_id,
+            username,
+            f"{username}@{rng.choice(vocabulary.domains)}",
+            plan.password_hash,
+            timestamp(newest - rng.uniform(plan.days, 730) * 86400),
+        )
+
+
+def stream_rows(plan: SeedPlan, vocabulary: Vocabulary, chunk: int, start: int, end: int) -> Iterator[tuple]:
+    rng = plan.rng("streams", chunk)
+    for index in range(start, end):
+        live = bool(plan.stream_live[index])
+        yield (
+            plan.first_ids["streams"] + index,
+            plan.first_ids["users"] + index,
+            rng.choice(vocabulary.titles),
+            rng.choice(vocabulary.descriptions),
+            live,
+            timestamp(plan.stream_starts[index]),
+            None if live else timestamp(plan.stream_ends[index]),
+            f"{rng.getrandbits(128):032x}",
+        )
+
+
+def follow_rows(plan: SeedPlan, vocabulary: Vocabulary, chunk: int, start: int, end: int) -> Iterator[tuple]:
+    rng = plan.rng("follows", chunk)
+    follow_id = plan.first_ids["follows"] + plan.follow_chunks[chunk][0]
+    newest = plan.until.timestamp()
+    for index, degree in zip(range(start, end), plan.follow_degrees(chunk, start, end)):
+        followed: set[int] = set()
+        # popular streamers are drawn first; a rare huge degree would take
+        # forever to collect from the Zipf tail, so the rest is uniform
+        for _ in range(degree * 8):
+            if len(followed) >= degree:
+                break
+            target = plan.popular_stream(rng)
+            if target != index:
+                followed.add(target)
+        while len(followed) < degree:
+            target = rng.randrange(plan.streams)
+            if target != index:
+                followed.add(target)
+        for target in sorted(followed):
+            yield (
+                follow_id,
+                plan.first_ids["users"] + index,
+                plan.first_ids["users"] + target,
+                timestamp(newest - rng.uniform(0, 365) * 86400),
+            )
+            follow_id += 1
+
+
+def chat_rows(plan: SeedPlan, vocabulary: Vocabulary, chunk: int, start: int, end: int) -> Iterator[tuple]:
+    rng = plan.rng("chats", chunk)
+    for index in range(start, end):
+        stream = plan.popular_stream(rng)
+        moment = rng.uniform(plan.stream_starts[stream], plan.stream_ends[stream])
+        yield (
+            plan.first_ids["chats"] + index,
+            plan.first_ids["streams"] + stream,
+            plan.first_ids["users"] + rng.randrange(plan.users),
+            " ".join(rng.choices(vocabulary.words, k=rng.randint(1, 12))),
+            timestamp(moment),
+        )
+
+
+TABLES = {
+    "users": (USER_COLUMNS, user_rows),
+    "streams": (STREAM_COLUMNS, stream_rows),
+    "follows": (FOLLOW_COLUMNS, follow_rows),
+    "chats": (CHAT_COLUMNS, chat_rows),
+}
+
+worker_plan: Optional[SeedPlan] = None
+worker_vocabulary: Optional[Vocabulary] = None
+
+
+def init_worker(plan: SeedPlan):
+    global worker_plan, worker_vocabulary
+    # connections inherited from the parent must not be shared after fork
+    engine.dispose(close=False)
+    worker_plan = plan
+    worker_vocabulary = Vocabulary(plan.seed)
+
+
+def load_chunk(table: str, chunk: int, start: int, end: int) -> int:
+    columns, generate = TABLES[table]
+    return copy_rows(table, columns, generate(worker_plan, worker_vocabulary, chunk, start, end))
+
+
+def load_table(pool: ProcessPoolExecutor, plan: SeedPlan, table: str, total: int):
+    started = time.monotonic()
+    futures = [pool.submit(load_chunk, table, chunk, start, end) for chunk, (start, end) in enumerate(plan.chunks(total))]
+    loaded = 0
+    for future in futures:
+        loaded += future.result()
+        elapsed = time.monotonic() - started
+        print(f"{table}: {loaded:,} rows ({loaded / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+def max_ids() -> dict[str, int]:
+    with engine.connect() as conn:
+        return {table: conn.execute(text(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")).scalar() for table in TABLES}
+
+
+def finish():
+    # rows were loaded with explicit ids, so move the sequences past them
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in TABLES:
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 1) FROM {table}))"
+            ))
+            conn.execute(text(f"ANALYZE {table}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a synthetic dataset with COPY.")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--streams", type=int, default=2_000, help="one per streamer, owned by the first users")
+    parser.add_argument("--follows-per-user", type=float, default=20)
+    parser.add_argument("--chats", type=int, default=1_000_000)
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew across streamers")
+    parser.add_argument("--live-fraction", type=float, default=0.05)
+    parser.add_argument("--days", type=int, default=30, help="history that streams and chats span")
+    parser.add_argument("--until", help="end of the generated history, YYYY-MM-DD (default: today)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args()
+
+    if args.streams > args.users:
+        parser.error("--streams cannot exceed --users")
+
+    until = (
+        datetime.strptime(args.until, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        if args.until
+        else datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    )
+    plan = SeedPlan(args, until, max_ids())
+    plan.plan_streams()
+    plan.plan_follows()
+    follows = sum(count for _, count in plan.follow_chunks)
+    print(f"Seeding {args.users:,} users, {args.streams:,} streams, {follows:,} follows, {args.chats:,} chats")
+
+    with engine.begin() as conn:
+        retention.ensure_partitions(conn, max(datetime.now(timezone.utc), until), since=until - timedelta(days=args.days))
+
+    # one bcrypt hash shared by every seeded account
+    plan.password_hash = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(SEEDED_PASSWORD)
+    with ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(plan,)) as pool:
+        # foreign keys are checked per row, so parents load first
+        load_table(pool, plan, "users", args.users)
+        load_table(pool, plan, "streams", args.streams)
+        load_table(pool, plan, "follows", args.users)
+        load_table(pool, plan, "chats", args.chats)
+
+    finish()
+    print(f"Seeded accounts share the password {SEEDED_PASSWORD!r}")
+
+
+if __name__ == "__main__":
+    main()
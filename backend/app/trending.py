@@ -0,0 +1,149 @@
+# ./trending.py
+import heapq
+import math
+import asyncio
+import time
+from typing import Optional
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+
+
+class StreamTrend:
+    # growth and chat are exponentially decayed sums, brought up to date
+    # lazily whenever the stream has an event or is scored
+    __slots__ = ("streamer_id", "viewers", "growth", "chat", "followers", "updated")
+
+    def __init__(self, streamer_id: Optional[int], followers: int, now: float):
+        self.streamer_id = streamer_id
+        self.viewers = 0
+        self.growth = 0.0
+        self.chat = 0.0
+        self.followers = followers
+        self.updated = now
+
+
+class TrendingTracker:
+    def __init__(self, half_life: float, refresh_seconds: float, max_k: int):
+        self.decay_rate = math.log(2) / half_life
+        self.refresh_seconds = refresh_seconds
+        self.max_k = max_k
+        self.trends: dict[int, StreamTrend] = {}
+        self.streamer_streams: dict[int, int] = {}
+        self.ranking: list[tuple[float, int]] = []
+        self.ranked_at = float("-inf")
+
+    def decay(self, trend: StreamTrend, now: float):
+        factor = math.exp(-self.decay_rate * (now - trend.updated))
+        trend.growth *= factor
+        trend.chat *= factor
+        trend.updated = now
+
+    def start(self, stream_id: int, streamer_id: int, followers: int, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        trend = self.trends.get(stream_id)
+        if trend is None:
+            trend = self.trends[stream_id] = StreamTrend(streamer_id, followers, now)
+        trend.streamer_id = streamer_id
+        trend.followers = followers
+        self.streamer_streams[streamer_id] = stream_id
+
+    def forget(self, stream_id: int):
+        trend = self.trends.pop(stream_id, None)
+        if trend is not None and self.streamer_streams.get(trend.streamer_id) == stream_id:
+            del self.streamer_streams[trend.streamer_id]
+
+    def sync(self, live: set[int], started: dict[int, tuple[int, int]], now: Optional[float] = None):
+        # live holds every live stream id, started maps the ones this worker
+        # did not know of to (streamer id, followers). Go-live events can be
+        # missed while the listener reconnects; this registers those streams
+        # and prunes ended ones, leaving tracked follower counts to follows
+        for stream_id in [stream_id for stream_id in self.trends if stream_id not in live]:
+            self.forget(stream_id)
+        for stream_id, (streamer_id, followers) in started.items():
+            if stream_id in live and stream_id not in self.trends:
+                self.start(stream_id, streamer_id, followers, now)
+
+    def record_viewers(self, stream_id: int, count: int, now: Optional[float] = None):
+        trend = self.trends.get(stream_id)
+        if trend is None:
+            return
+        now = time.monotonic() if now is None else now
+        self.decay(trend, now)
+        trend.growth += count - trend.viewers
+        trend.viewers = count
+
+    def record_message(self, stream_id: int, now: Optional[float] = None):
+        trend = self.trends.get(stream_id)
+        if trend is None:
+            return
+        now = time.monotonic() if now is None else now
+        self.decay(trend, now)
+        trend.chat += 1
+
+    def add_followers(self, streamer_id: int, delta: int):
+        stream_id = self.streamer_streams.get(streamer_id)
+        trend = self.trends.get(stream_id) if stream_id is not None else None
+        if trend is not None:
+            trend.followers = max(0, trend.followers + delta)
+
+    def score(self, trend: StreamTrend, now: float) -> float:
+        self.decay(trend, now)
+        # a decayed event count times the decay rate approximates events per second
+        chat_per_minute = trend.chat * self.decay_rate * 60
+        return (
+            settings.trending_viewer_weight * trend.viewers
+            + settings.trending_growth_weight * trend.growth
+            + settings.trending_chat_weight * chat_per_minute
+            + settings.trending_follower_weight * math.log1p(trend.followers)
+        )
+
+    def top(self, k: int, now: Optional[float] = None) -> list[int]:
+        now = time.monotonic() if now is None else now
+        if now - self.ranked_at >= self.refresh_seconds:
+            self.ranking = heapq.nlargest(
+                self.max_k,
+                ((self.score(trend, now), stream_id) for stream_id, trend in list(self.trends.items()))
+            )
+            self.ranked_at = now
+        return [stream_id for _, stream_id in self.ranking[:k]]
+
+
+trending = TrendingTracker(
+    settings.trending_half_life_seconds,
+    settings.trending_refresh_seconds,
+    settings.trending_max_k
+)
+
+
+def load_live_streams(known: set[int]) -> tuple[set[int], dict[int, tuple[int, int]]]:
+    # followers are only counted for streams missing from known
+    db = SessionLocal()
+    try:
+        streams = db.query(models.Stream.id, models.Stream.user_id).filter(models.Stream.is_live == True).all()
+        started = {stream_id: user_id for stream_id, user_id in streams if stream_id not in known}
+        followers = {}
+        if started:
+            followers = dict(
+                db.query(models.Follow.followed_id, func.count(models.Follow.id))
+                .filter(models.Follow.followed_id.in_(set(started.values())))
+                .group_by(models.Follow.followed_id)
+                .all()
+            )
+        return (
+            {stream_id for stream_id, _ in streams},
+            {stream_id: (user_id, followers.get(user_id, 0)) for stream_id, user_id in started.items()}
+        )
+    finally:
+        db.close()
+
+
+async def run_sync():
+    while True:
+        try:
+            trending.sync(*await run_in_threadpool(load_live_streams, set(trending.trends)))
+        except Exception as e:
+            print(f"Trending sync failed: {e}")
+        await asyncio.sleep(settings.trending_sync_seconds)
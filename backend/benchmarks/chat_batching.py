@@ -0,0 +1,41 @@
+# ./benchmarks/chat_batching.py
+# python -m benchmarks.chat_batching [viewers] [messages_per_second] [seconds]
+import asyncio
+import sys
+import time
+from app.batching import ChatBatcher
+
+
+async def measure(viewers: int, rate: float, seconds: float, window_ms: int, threshold: float):
+    sends = 0
+    frames = 0
+    latencies: list[float] = []
+
+    async def send(stream_id: int, message: dict):
+        nonlocal sends, frames
+        frames += 1
+        sends += viewers
+        now = time.monotonic()
+        payload = message["data"] if message["type"] == "chat_batch" else [message["data"]]
+        latencies.extend(now - data["sent_at"] for data in payload)
+
+    batcher = ChatBatcher(send, window_ms, threshold)
+    interval = 1 / rate
+    total = int(rate * seconds)
+    for i in range(total):
+        await batcher.publish(1, {"type": "chat_message", "data": {"id": i, "sent_at": time.monotonic()}})
+        await asyncio.sleep(interval)
+    await asyncio.sleep(window_ms / 1000 * 2)
+
+    latencies.sort()
+    print(f"window: {window_ms:>3} ms  threshold: {threshold:>6}  messages: {total}  frames: {frames}  "
+          f"socket sends: {sends:,}  p99 added latency: {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    viewers = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+    asyncio.run(measure(viewers, rate, seconds, 75, float("inf")))
+    asyncio.run(measure(viewers, rate, seconds, 75, 20))
+    asyncio.run(measure(viewers, rate, seconds, 100, 20))
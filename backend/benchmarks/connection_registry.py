@@ -0,0 +1,45 @@
+# ./benchmarks/connection_registry.py
+# python -m benchmarks.connection_registry [connections] [streams]
+import sys
+import time
+import tracemalloc
+from app.connections import ConnectionRegistry
+
+
+class FakeWebSocket:
+    __slots__ = ()
+
+
+def measure(connections: int, streams: int):
+    sockets = [FakeWebSocket() for _ in range(connections)]
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    registry = ConnectionRegistry()
+    started = time.perf_counter()
+    for i, websocket in enumerate(sockets):
+        stream_id = i % streams
+        registry.add(websocket, stream_id, i, streamer_id=stream_id)
+    add_seconds = time.perf_counter() - started
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    started = time.perf_counter()
+    for websocket in sockets:
+        registry.remove(websocket)
+    remove_seconds = time.perf_counter() - started
+
+    print(f"connections:          {connections}")
+    print(f"streams:              {streams}")
+    print(f"bytes per connection: {allocated / connections:.1f}")
+    print(f"add:                  {connections / add_seconds:,.0f} ops/s")
+    print(f"remove:               {connections / remove_seconds:,.0f} ops/s")
+    print(f"left after removal:   {len(registry)}")
+
+
+if __name__ == "__main__":
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    streams = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    measure(connections, streams)
@@ -0,0 +1,82 @@
+# ./benchmarks/framing.py
+# python -m benchmarks.framing [iterations]
+import random
+import sys
+import time
+import zlib
+from app import framing
+
+CHAT_MESSAGE = {
+    "type": "chat_message",
+    "data": {
+        "id": 18234711,
+        "user_id": 40213,
+        "username": "some_viewer_42",
+        "message": "that play was actually insane KEKW",
+        "emotes": [[30, 34]],
+        "timestamp": "2026-10-19T13:05:11.482931+00:00",
+    }
+}
+
+CHAT_BATCH = {
+    "type": "chat_batch",
+    "data": [dict(CHAT_MESSAGE["data"], id=CHAT_MESSAGE["data"]["id"] + i, user_id=40213 + i) for i in range(10)]
+}
+
+VIEWER_COUNT = {"type": "viewer_count_update", "data": {"viewer_count": 18342}}
+
+FRAMES = {"chat_message": CHAT_MESSAGE, "chat_batch (10)": CHAT_BATCH, "viewer_count": VIEWER_COUNT}
+
+WORDS = "gg wp no way lol KEKW that was clean actually insane chat is wild PogU let him cook".split()
+
+
+def vary(message: dict, rng: random.Random) -> dict:
+    # later frames on a socket share keys with earlier ones but not their content
+    def vary_data(data: dict) -> dict:
+        data = dict(data)
+        for key, value in data.items():
+            if key == "message":
+                data[key] = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12)))
+            elif key == "username":
+                data[key] = f"viewer_{rng.randint(1, 10**6)}"
+            elif isinstance(value, int):
+                data[key] = value + rng.randint(1, 1000)
+        return data
+
+    if isinstance(message["data"], list):
+        return {"type": message["type"], "data": [vary_data(data) for data in message["data"]]}
+    return {"type": message["type"], "data": vary_data(message["data"])}
+
+
+def per_socket_deflate(messages: list[dict]) -> tuple[int, float]:
+    # what permessage-deflate with context takeover does: one compressor per socket
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    started = time.perf_counter()
+    total = 0
+    for message in messages:
+        data = framing.encode(message, framing.JSON).encode()
+        total += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return total, time.perf_counter() - started
+
+
+def measure(iterations: int):
+    rng = random.Random(1)
+    encodings = sorted(framing.ENCODINGS)
+    print(f"{'frame':<18}" + "".join(f"{encoding:>22}" for encoding in encodings) + f"{'socket deflate':>22}")
+    for name, message in FRAMES.items():
+        row = f"{name:<18}"
+        for encoding in encodings:
+            size = len(framing.encode(message, encoding))
+            started = time.perf_counter()
+            for _ in range(iterations):
+                framing.encode(message, encoding)
+            micros = (time.perf_counter() - started) / iterations * 1e6
+            row += f"{size:>10} B {micros:>7.1f} us"
+        total, seconds = per_socket_deflate([vary(message, rng) for _ in range(iterations)])
+        row += f"{total / iterations:>10.0f} B {seconds / iterations * 1e6:>7.1f} us"
+        print(row)
+    print("socket deflate is per receiving socket; the other encodings run once per broadcast")
+
+
+if __name__ == "__main__":
+    measure(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,356 @@
+# ./benchmarks/load.py
+# python -m benchmarks.load [--senders 200] [--receivers 2000] [--viewers 1000] [--seconds 30]
+#                           [--baseline benchmarks/load_baseline.json] [--write-baseline]
+# Migrates DATABASE_URL (point it at a throwaway database), starts one
+# uvicorn worker against it, seeds its own users and streams, and drives it
+# over real sockets: chat senders and receivers, viewer sockets, homepage
+# pollers and RTMP publish/unpublish callbacks. Thousands of sockets need
+# `ulimit -n` well above the connection count. With --baseline the run
+# fails (exit 1) when a gated result regresses by more than --tolerance.
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import httpx
+from websockets.asyncio.client import connect
+from app import models
+from app.database import SessionLocal
+from app.routes.oauth2 import create_access_token
+
+# the server is launched with flood limits out of the way so throughput is
+# bounded by the server, not by rate limiting
+SERVER_ENV = {
+    "SQL_PROFILER_ENABLED": "true",
+    "SQL_SLOW_QUERY_MS": "1000000",
+    "CHAT_USER_RATE": "1000",
+    "CHAT_USER_BURST": "1000",
+    "CHAT_STREAM_RATE": "100000",
+    "CHAT_STREAM_BURST": "100000",
+}
+
+LOWER_IS_BETTER = (
+    "broadcast_latency_ms.p95",
+    "broadcast_latency_ms.p99",
+    "http_latency_ms.p95",
+    "rtmp_latency_ms.p95",
+    "memory_per_connection_kb",
+)
+HIGHER_IS_BETTER = ("deliveries_per_second",)
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    values = sorted(values)
+    pick = lambda q: round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 2)
+    return {"p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(values[-1] * 1000, 2)}
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(prefix: str, users: int, live_streams: int, rtmp_streams: int) -> tuple[list[int], list[int], list[str]]:
+    with SessionLocal() as db:
+        rows = [
+            models.User(username=f"{prefix}{i}", email=f"{prefix}{i}@example.com", hashed_password="!")
+            for i in range(users)
+        ]
+        db.add_all(rows)
+        db.commit()
+        user_ids = [user.id for user in rows]
+
+        streams = [
+            models.Stream(user_id=user_ids[i % users], title=f"{prefix} {i}", stream_key=f"{prefix}-{i}", is_live=i < live_streams)
+            for i in range(live_streams + rtmp_streams)
+        ]
+        db.add_all(streams)
+        db.commit()
+        return user_ids, [stream.id for stream in streams[:live_streams]], [stream.stream_key for stream in streams[live_streams:]]
+
+
+def cleanup(prefix: str):
+    # users cascade to their streams, follows and chats in the database
+    with SessionLocal() as db:
+        db.query(models.User).filter(models.User.username.startswith(prefix)).delete(synchronize_session=False)
+        db.commit()
+
+
+class LoadRun:
+    def __init__(self, args, base_url: str):
+        self.args = args
+        self.base_url = base_url
+        self.ws_url = base_url.replace("http://", "ws://")
+        self.stop = asyncio.Event()
+        self.sent_at: dict[str, float] = {}
+        self.sent = 0
+        self.sent_per_stream: dict[int, int] = {}
+        self.receivers_per_stream: dict[int, int] = {}
+        self.rejected = 0
+        self.deliveries = 0
+        self.broadcast_latencies: list[float] = []
+        self.http_latencies: list[float] = []
+        self.rtmp_latencies: list[float] = []
+        self.errors = 0
+        self.opened = 0
+        self.gate = asyncio.Semaphore(args.connect_concurrency)
+
+    async def open(self, url: str):
+        async with self.gate:
+            websocket = await connect(url, ping_interval=None, max_size=None, open_timeout=30)
+        self.opened += 1
+        return websocket
+
+    def receive(self, message: dict):
+        now = time.perf_counter()
+        if message.get("type") == "chat_message":
+            payload = [message["data"]]
+        elif message.get("type") == "chat_batch":
+            payload = message["data"]
+        else:
+            return
+        for data in payload:
+            sent_at = self.sent_at.get(data["message"])
+            if sent_at is not None:
+                self.deliveries += 1
+                self.broadcast_latencies.append(now - sent_at)
+
+    async def listen(self, websocket, measure: bool):
+        async for raw in websocket:
+            message = json.loads(raw)
+            if message.get("type") == "ping":
+                await websocket.send('{"type": "pong"}')
+            elif message.get("type") == "error":
+                self.rejected += 1
+            elif measure:
+                self.receive(message)
+
+    async def chat_sender(self, index: int, stream_id: int, token: str, ready: asyncio.Event):
+        websocket = await self.open(f"{self.ws_url}/ws/streams/{stream_id}/chat?token={token}")
+        listener = asyncio.create_task(self.listen(websocket, measure=False))
+        await ready.wait()
+        interval = 1 / self.args.rate
+        # stagger senders so they do not all fire on the same tick
+        await asyncio.sleep(interval * index / max(1, self.args.senders))
+        seq = 0
+        try:
+            while not self.stop.is_set():
+                text = f"load {index} {seq}"
+                self.sent_at[text] = time.perf_counter()
+                await websocket.send(json.dumps({"type": "chat_message", "data": {"message": text}}))
+                self.sent += 1
+                self.sent_per_stream[stream_id] = self.sent_per_stream.get(stream_id, 0) + 1
+                seq += 1
+                await asyncio.sleep(interval)
+        finally:
+            listener.cancel()
+            await websocket.close()
+
+    async def chat_receiver(self, stream_id: int, token: str):
+        websocket = await self.open(f"{self.ws_url}/ws/streams/{stream_id}/chat?token={token}")
+        self.receivers_per_stream[stream_id] = self.receivers_per_stream.get(stream_id, 0) + 1
+        listener = asyncio.create_task(self.listen(websocket, measure=True))
+        await self.stop.wait()
+        listener.cancel()
+        await websocket.close()
+
+    async def viewer(self, stream_id: int, token: str):
+        websocket = await self.open(f"{self.ws_url}/ws/streams/{stream_id}/viewer?token={token}")
+        listener = asyncio.create_task(self.listen(websocket, measure=False))
+        await self.stop.wait()
+        listener.cancel()
+        await websocket.close()
+
+    async def poller(self, client: httpx.AsyncClient, ready: asyncio.Event):
+        await ready.wait()
+        while not self.stop.is_set():
+            for path in ("/streams/all", "/streams/trending"):
+                start = time.perf_counter()
+                response = await client.get(path)
+                self.http_latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    self.errors += 1
+            await asyncio.sleep(self.args.poll_interval)
+
+    async def publisher(self, client: httpx.AsyncClient, stream_key: str, ready: asyncio.Event):
+        await ready.wait()
+        while not self.stop.is_set():
+            for callback in ("/rtmp/on_publish", "/rtmp/on_publish_done"):
+                start = time.perf_counter()
+                response = await client.post(callback, data={"name": stream_key})
+                self.rtmp_latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    self.errors += 1
+                await asyncio.sleep(self.args.publish_interval / 2)
+
+    async def run(self, pid: int, user_ids: list[int], stream_ids: list[int], stream_keys: list[str]) -> dict:
+        args = self.args
+        tokens = [create_access_token({"user_id": user_id}) for user_id in user_ids]
+        ready = asyncio.Event()
+        idle_rss = rss_kb(pid)
+
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=30) as client:
+            receivers = [
+                asyncio.create_task(self.chat_receiver(stream_ids[i % len(stream_ids)], tokens[i % len(tokens)]))
+                for i in range(args.receivers)
+            ]
+            viewers = [
+                asyncio.create_task(self.viewer(stream_ids[i % len(stream_ids)], tokens[i % len(tokens)]))
+                for i in range(args.viewers)
+            ]
+            senders = [
+                asyncio.create_task(self.chat_sender(i, stream_ids[i % len(stream_ids)], tokens[i], ready))
+                for i in range(args.senders)
+            ]
+            connections = args.receivers + args.viewers + args.senders
+            while self.opened < connections:
+                failed = [task for task in receivers + viewers + senders if task.done() and task.exception()]
+                if failed:
+                    raise failed[0].exception()
+                await asyncio.sleep(0.1)
+            # let the server settle its per-connection state before measuring
+            await asyncio.sleep(1)
+            connected_rss = rss_kb(pid)
+            print(f"{connections:,} sockets open, server RSS {idle_rss / 1024:.0f} -> {connected_rss / 1024:.0f} MiB")
+
+            workers = [asyncio.create_task(self.poller(client, ready)) for _ in range(args.pollers)]
+            workers += [asyncio.create_task(self.publisher(client, key, ready)) for key in stream_keys]
+            ready.set()
+            start = time.perf_counter()
+            await asyncio.sleep(args.seconds)
+            self.stop.set()
+            elapsed = time.perf_counter() - start
+            # in-flight broadcasts still count toward latency
+            await asyncio.sleep(1)
+            await asyncio.gather(*senders, *receivers, *viewers, *workers, return_exceptions=True)
+
+            profile = (await client.get("/debug/sql-profile")).json()
+
+        return {
+            "connections": connections,
+            "messages_sent": self.sent,
+            "messages_rejected": self.rejected,
+            "deliveries": self.deliveries,
+            "deliveries_per_second": round(self.deliveries / elapsed, 1),
+            "expected_deliveries": sum(
+                sent * self.receivers_per_stream.get(stream_id, 0) for stream_id, sent in self.sent_per_stream.items()
+            ),
+            "broadcast_latency_ms": percentiles(self.broadcast_latencies),
+            "http_latency_ms": percentiles(self.http_latencies),
+            "rtmp_latency_ms": percentiles(self.rtmp_latencies),
+            "http_errors": self.errors,
+            "memory_per_connection_kb": round((connected_rss - idle_rss) / connections, 2),
+            "db_queries": {label: stats["avg_queries"] for label, stats in profile.items()},
+        }
+
+
+def lookup(results: dict, path: str) -> float:
+    value = results
+    for key in path.split("."):
+        value = value[key]
+    return value
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    failures = []
+    for path in LOWER_IS_BETTER:
+        current, previous = lookup(results, path), lookup(baseline, path)
+        if previous and current > previous * (1 + tolerance):
+            failures.append(f"{path}: {current} > {previous} baseline")
+    for path in HIGHER_IS_BETTER:
+        current, previous = lookup(results, path), lookup(baseline, path)
+        if current < previous * (1 - tolerance):
+            failures.append(f"{path}: {current} < {previous} baseline")
+    # query counts are deterministic per route, so any growth is a regression
+    for label, previous in baseline.get("db_queries", {}).items():
+        current = results["db_queries"].get(label)
+        if current is not None and current > previous:
+            failures.append(f"queries per {label}: {current} > {previous} baseline")
+    return failures
+
+
+def start_server(port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **SERVER_ENV}
+    )
+
+
+def wait_for_server(base_url: str, server: subprocess.Popen):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with {server.returncode}")
+        try:
+            if httpx.get(f"{base_url}/").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Server did not start within 60 seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API and WebSocket endpoints.")
+    parser.add_argument("--senders", type=int, default=200)
+    parser.add_argument("--receivers", type=int, default=2000)
+    parser.add_argument("--viewers", type=int, default=1000)
+    parser.add_argument("--pollers", type=int, default=50)
+    parser.add_argument("--publishers", type=int, default=20)
+    parser.add_argument("--streams", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=0.5, help="chat messages per second per sender")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--publish-interval", type=float, default=2.0)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--baseline", help="JSON results to gate against")
+    parser.add_argument("--write-baseline", action="store_true", help="store this run's results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    prefix = f"load{int(time.time())}_"
+    subprocess.run([sys.executable, "-m", "app.migrations"], check=True)
+    server = start_server(port)
+    try:
+        wait_for_server(base_url, server)
+        user_ids, stream_ids, stream_keys = seed(prefix, max(args.senders, args.streams + args.publishers), args.streams, args.publishers)
+        results = asyncio.run(LoadRun(args, base_url).run(server.pid, user_ids, stream_ids, stream_keys))
+    finally:
+        server.terminate()
+        server.wait()
+        cleanup(prefix)
+
+    print(json.dumps(results, indent=2))
+
+    if args.baseline and args.write_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            failures = regressions(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        if failures:
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
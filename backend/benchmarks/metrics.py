@@ -0,0 +1,34 @@
+# ./benchmarks/metrics.py
+# python -m benchmarks.metrics [observations]
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.metrics import Histogram
+
+
+def observe_many(histogram: Histogram, count: int):
+    for i in range(count):
+        histogram.observe((i % 1000) / 10_000, "GET", "/streams/{stream_id}", "200")
+
+
+def measure(count: int, threads: int):
+    histogram = Histogram("bench_seconds", "benchmark", ("method", "route", "status"))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for _ in range(threads):
+            pool.submit(observe_many, histogram, count // threads)
+    elapsed = time.perf_counter() - start
+
+    render_start = time.perf_counter()
+    lines = histogram.render()
+    render = time.perf_counter() - render_start
+
+    total = int(lines[-1].rsplit(" ", 1)[1])
+    print(f"threads: {threads:>2}  per observe: {elapsed / count * 1e9:.0f} ns  "
+          f"render: {render * 1e6:.0f} us  counted: {total}/{count}")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for threads in (1, 4, 16):
+        measure(count, threads)
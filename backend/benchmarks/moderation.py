@@ -0,0 +1,35 @@
+# ./benchmarks/moderation.py
+# python -m benchmarks.moderation [terms] [messages]
+import random
+import string
+import sys
+import time
+from app.moderation import TermMatcher
+
+
+def random_word(rng: random.Random, low: int = 3, high: int = 10) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def measure(term_count: int, message_count: int, seed: int = 1):
+    rng = random.Random(seed)
+    terms = {random_word(rng, 4, 12) for _ in range(term_count)}
+    messages = [" ".join(random_word(rng) for _ in range(rng.randint(3, 20))) for _ in range(message_count)]
+
+    started = time.perf_counter()
+    matcher = TermMatcher(terms)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    hits = sum(1 for message in messages if matcher.search(message))
+    search_seconds = time.perf_counter() - started
+
+    print(f"terms: {len(matcher):>6}  states: {len(matcher.goto):>7}  build: {build_seconds * 1000:8.1f} ms  "
+          f"messages/s: {message_count / search_seconds:>10,.0f}  hits: {hits}")
+
+
+if __name__ == "__main__":
+    term_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    message_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    for count in (10, 1_000, term_count):
+        measure(count, message_count)
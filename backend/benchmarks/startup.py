@@ -0,0 +1,82 @@
+# ./benchmarks/startup.py
+# python -m benchmarks.startup [--runs 5] [--budget-ms 1500] [--top 15]
+# Imports app.main the way a uvicorn worker does, in fresh interpreters
+# under -X importtime, with the dev-only routers switched off. Reports the
+# median import time, peak RSS and the slowest modules; exits 1 when the
+# median is over --budget-ms or a module listed in --forbid was imported.
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+WORKER_ENV = {
+    "MOCK_API_ENABLED": "false",
+    "SCALAR_DOCS_ENABLED": "false",
+}
+
+FORBIDDEN = ("faker", "scalar_fastapi")
+
+PROBE = "import resource, app.main; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    # "import time: self [us] | cumulative | imported package", nesting shown
+    # by indentation; the cumulative column already includes children
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(total)
+    return cumulative
+
+
+def measure() -> tuple[dict[str, int], int]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        env={**os.environ, **WORKER_ENV},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing app.main failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr), int(result.stdout.split()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure worker import time against a budget.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", nargs="*", default=FORBIDDEN, help="top-level packages a worker must not import")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    totals = [modules["app.main"] / 1000 for modules, _ in runs]
+    median_ms = statistics.median(totals)
+    rss_mib = statistics.median(rss for _, rss in runs) / 1024
+
+    modules, _ = runs[-1]
+    print(f"app.main import: median {median_ms:.0f} ms, min {min(totals):.0f} ms, max {max(totals):.0f} ms over {args.runs} runs")
+    print(f"peak RSS after import: {rss_mib:.1f} MiB")
+    print("slowest top-level imports (cumulative ms, last run):")
+    top_level = {name: us for name, us in modules.items() if "." not in name and name != "app"}
+    for name, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f}  {name}")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"import time {median_ms:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+    for package in args.forbid:
+        if package in modules:
+            failures.append(f"{package} is imported at worker startup")
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        sys.exit(1)
+    print("Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# ./benchmarks/trending.py
+# python -m benchmarks.trending [live_streams] [events]
+import random
+import sys
+import time
+from app.trending import TrendingTracker
+
+
+def measure(streams: int, events: int):
+    tracker = TrendingTracker(300, 5, 100)
+    for stream_id in range(streams):
+        tracker.start(stream_id, stream_id, random.randint(0, 100_000), 0.0)
+
+    viewers = [0] * streams
+    start = time.perf_counter()
+    for i in range(events):
+        stream_id = random.randrange(streams)
+        now = i / 1000
+        if i % 3:
+            tracker.record_message(stream_id, now)
+        else:
+            viewers[stream_id] = max(0, viewers[stream_id] + random.choice((-1, 1, 1)))
+            tracker.record_viewers(stream_id, viewers[stream_id], now)
+    per_event = (time.perf_counter() - start) / events
+
+    start = time.perf_counter()
+    rankings = 100
+    for i in range(rankings):
+        tracker.top(20, events / 1000 + i * 5)
+    per_ranking = (time.perf_counter() - start) / rankings
+
+    start = time.perf_counter()
+    for _ in range(10_000):
+        tracker.top(20, events / 1000 + rankings * 5)
+    per_cached = (time.perf_counter() - start) / 10_000
+
+    print(f"live streams: {streams:>6}  per event: {per_event * 1e6:.2f} us  "
+          f"per ranking: {per_ranking * 1000:.2f} ms  cached top-20: {per_cached * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+    if len(sys.argv) > 1:
+        measure(int(sys.argv[1]), events)
+    else:
+        for streams in (100, 1_000, 10_000):
+            measure(streams, events)
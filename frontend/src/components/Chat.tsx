@@ -1,7 +1,7 @@
 // components/Chat.tsx
 import React, { useState, useEffect, useRef } from 'react';
 // import { useAuth } from '../contexts/useAuth';
-import type { ChatProps, ChatMessage, ChatResponse } from '../types/ChatTypes'
+import type { ChatProps, ChatMessage, ChatMessageData, ChatErrorData, ChatResponse, EmoteCatalog } from '../types/ChatTypes'
 import { useWebSocket } from '../hooks/useWebSocket';
 import { api, WEBSOCKET_URL } from '../api';
 
@@ -18,6 +18,18 @@ const USER_COLORS = [
   '#FF1493', // DeepPink
 ];
 
+const CHAT_ERROR_REASONS: Record<ChatErrorData['code'], string> = {
+  user_rate_limited: "You're sending messages too quickly.",
+  stream_rate_limited: 'Chat is busy right now.',
+  slow_mode: 'Slow mode is on.',
+  blocked_term: 'Your message contains a blocked term.',
+};
+
+function describeChatError({ code, retry_after }: ChatErrorData): string {
+  const reason = CHAT_ERROR_REASONS[code] ?? 'Your message was not sent.';
+  return retry_after ? `${reason} Try again in ${Math.ceil(retry_after)}s.` : reason;
+}
+
 function getUsernameColor(username: string): string {
   let hash = 0;
   for (let i = 0; i < username.length; i++) {
@@ -33,22 +45,58 @@ export default function Chat({ streamId, streamerId, isAuthenticated }: ChatProp
   // const [isConnected, setIsConnected] = useState(false);
   const [emotes, setEmotes] = useState<Map<string, string>>(new Map());
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const lastSeenId = useRef<number | null>(null);
+  const [chatError, setChatError] = useState<string | null>(null);
+  // the server does not echo rejected messages, so the last one sent is kept
+  // to put back in the input
+  const lastSent = useRef('');
+  const errorTimer = useRef<ReturnType<typeof setTimeout> | null>(null);
   // const { user } = useAuth();
 
+  const toChatMessage = (data: ChatMessageData): ChatMessage => ({
+    id: data.id,
+    userId: data.user_id,
+    username: data.username,
+    message: data.message,
+    emotes: data.emotes,
+    timestamp: new Date(data.timestamp),
+    isStreamer: data.user_id === streamerId,
+  });
+
+  const appendMessages = (incoming: ChatMessage[]) => {
+    const fresh = incoming.filter(msg => lastSeenId.current === null || msg.id > lastSeenId.current);
+    if (fresh.length === 0) return;
+    lastSeenId.current = fresh[fresh.length - 1].id;
+    setMessages(prev => [...prev, ...fresh]);
+  };
+
+  const showChatError = (error: ChatErrorData) => {
+    setChatError(describeChatError(error));
+    setNewMessage(current => current || lastSent.current);
+    if (errorTimer.current) clearTimeout(errorTimer.current);
+    errorTimer.current = setTimeout(() => setChatError(null), Math.max(error.retry_after ?? 0, 4) * 1000);
+  };
+
+  useEffect(() => () => {
+    if (errorTimer.current) clearTimeout(errorTimer.current);
+  }, []);
+
   const { isConnected, sendMessage } = useWebSocket(
     `${WEBSOCKET_URL}/ws/streams/${streamId}/chat?token=${localStorage.getItem("token")}`,
     (message) => {
       // console.log("WEBSOCKST", message)
       if (message.type === 'chat_message') {
-        const chatMessage: ChatMessage = {
-          id: message.data.id,
-          userId: message.data.user_id,
-          username: message.data.username,
-          message: message.data.message,
-          timestamp: new Date(message.data.timestamp),
-          isStreamer: message.data.user_id === streamerId,
-        };
-        setMessages(prev => [...prev, chatMessage]);
+        appendMessages([toChatMessage(message.data)]);
+      } else if (message.type === 'chat_batch') {
+        appendMessages(message.data.map(toChatMessage));
+      } else if (message.type === 'error') {
+        showChatError(message.data);
+      }
+    },
+    {
+      reconnectUrl: () => {
+        const base = `${WEBSOCKET_URL}/ws/streams/${streamId}/chat?token=${localStorage.getItem("token")}`;
+        return lastSeenId.current === null ? base : `${base}&last_seen_id=${lastSeenId.current}`;
       }
     }
   );
@@ -63,10 +111,16 @@ export default function Chat({ streamId, streamerId, isAuthenticated }: ChatProp
           userId: msg.user.id,
           username: msg.user?.username || 'Unknown',
           message: msg.message,
+          emotes: msg.emotes,
           timestamp: new Date(msg.timestamp),
           isStreamer: msg.user.id === streamerId,
         }));
-        setMessages(chatHistory);
+        // the socket may already have delivered messages newer than the history
+        const lastHistoryId = chatHistory.length > 0 ? chatHistory[chatHistory.length - 1].id : null;
+        if (lastHistoryId !== null && (lastSeenId.current === null || lastHistoryId > lastSeenId.current)) {
+          lastSeenId.current = lastHistoryId;
+        }
+        setMessages(prev => [...chatHistory, ...prev.filter(msg => lastHistoryId === null || msg.id > lastHistoryId)]);
       } catch (error) {
         console.error('Failed to load chat history:', error);
       }
@@ -76,46 +130,16 @@ export default function Chat({ streamId, streamerId, isAuthenticated }: ChatProp
   }, [streamId, streamerId]);
 
   useEffect(() => {
-    const loadAllEmotes = async () => {
-      const urls = [
-        "https://api.betterttv.net/3/cached/emotes/global",
-        "https://api.frankerfacez.com/v1/set/global",
-        "https://api.7tv.app/v3/emote-sets/01G0X6HFX8000EH87BCAZW2PPP",
-        "https://api.7tv.app/v3/emote-sets/01F6197X28000B6V3DJP9R671R",
-        "https://api.7tv.app/v3/emote-sets/01GW8MRR8R0000XWTYFAW9XRTZ"
-      ];
-
-      const map = new Map<string, string>();
-
-      for (const url of urls) {
-        try {
-          const res = await fetch(url);
-          const data = await res.json();
-
-          if (url.includes("betterttv")) {
-              // eslint-disable-next-line @typescript-eslint/no-explicit-any
-              data.forEach((e: any) => map.set(e.code, `https://cdn.betterttv.net/emote/${e.id}/1x`));
-          } else if (url.includes("frankerfacez")) {
-              const sets = data.sets;
-              for (const key in sets) {
-                  // eslint-disable-next-line @typescript-eslint/no-explicit-any
-                  sets[key].emoticons.forEach((e: any) =>
-                  map.set(e.name, e.urls["1"] || e.urls["2"])
-                  );
-          }
-          } else if (url.includes("7tv")) {
-              // eslint-disable-next-line @typescript-eslint/no-explicit-any
-              data.emotes.forEach((e: any) => 
-                  map.set(e.name, `https:${e.data.host.url}/${e.data.host.files[0].name}`));
-          }
-        } catch (err) {
-            console.warn(`Failed to load from ${url}`, err);
-        }
+    const loadEmotes = async () => {
+      try {
+        const response = await api.get<EmoteCatalog>('/emotes');
+        setEmotes(new Map(Object.entries(response.data.emotes)));
+      } catch (err) {
+        console.warn('Failed to load emotes', err);
       }
-      setEmotes(map);
     };
 
-    loadAllEmotes();
+    loadEmotes();
   }, []);
 
   const scrollToBottom = () => {
@@ -130,30 +154,44 @@ export default function Chat({ streamId, streamerId, isAuthenticated }: ChatProp
     e.preventDefault();
     
     if (!newMessage.trim() || !isAuthenticated || !isConnected) return;
+    lastSent.current = newMessage.trim();
     sendMessage({
       type: 'chat_message',
       data: {
-        message: newMessage.trim()
+        message: lastSent.current
       }
     });
 
     setNewMessage('');
+    setChatError(null);
   };
 
-  function renderMessageWithEmotes(text: string) {
-    const parts = text.split(/\s+/);
-    return parts.map((part, i) =>
-        emotes.has(part)
+  function renderMessageWithEmotes(text: string, spans: [number, number][] = []) {
+    const parts: React.ReactNode[] = [];
+    let cursor = 0;
+    spans.forEach(([start, end], i) => {
+      const name = text.slice(start, end);
+      if (start > cursor) {
+        parts.push(<span key={`t${i}`}>{text.slice(cursor, start)}</span>);
+      }
+      parts.push(
+        emotes.has(name)
         ? (
             <img
-                key={i}
-                src={emotes.get(part)}
-                alt={part}
+                key={`e${i}`}
+                src={emotes.get(name)}
+                alt={name}
                 className="inline w-6 h-6 mx-0.5 align-middle"
             />
           )
-        : <span key={i}>{part}</span>
-    );
+        : <span key={`e${i}`}>{name}</span>
+      );
+      cursor = end;
+    });
+    if (cursor < text.length) {
+      parts.push(<span key="rest">{text.slice(cursor)}</span>);
+    }
+    return parts;
   }
 
   return (
@@ -183,7 +221,7 @@ export default function Chat({ streamId, streamerId, isAuthenticated }: ChatProp
                         {message.username}:
                     </span>
                     {/* <span className="flex flex-wrap items-center"> */}
-                        {renderMessageWithEmotes(message.message)}
+                        {renderMessageWithEmotes(message.message, message.emotes)}
                     {/* </span> */}
                 </div>
 
@@ -192,6 +230,11 @@ export default function Chat({ streamId, streamerId, isAuthenticated }: ChatProp
         </div>
 
       <div className="p-3 border-t border-chat-border">
+        {chatError && (
+          <div role="alert" className="mb-2 text-xs text-red-400">
+            {chatError}
+          </div>
+        )}
         {isAuthenticated ? (
           <form onSubmit={handleSendMessage} className="flex gap-2">
             <input
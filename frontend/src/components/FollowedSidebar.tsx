@@ -5,6 +5,7 @@ import { useAuth } from '../contexts/useAuth';
 import type { Stream } from '../types/StreamTypes';
 import { Link } from 'react-router';
 import { useViewerCount } from '../hooks/useViewerCount';
+import { useNotifications } from '../hooks/useNotifications';
 
 interface SidebarProps {
   isExpanded: boolean;
@@ -19,21 +20,38 @@ interface FollowedUser {
   created_at: string;
 }
 
+// the largest page /users/me/following serves
+const FOLLOWING_PAGE_SIZE = 500;
+
+// only mounted for logged-in users, the notifications socket needs a token
+function GoLiveListener({ onStreamLive }: { onStreamLive: () => void }) {
+  useNotifications(onStreamLive);
+  return null;
+}
+
 export default function FollowedSidebar({ isExpanded, setIsExpanded }: SidebarProps) {
   const { user } = useAuth();
   const [followedStreamers, setFollowedStreamers] = useState<Stream[]>([]);
   const [loading, setLoading] = useState(true);
+  const [refreshKey, setRefreshKey] = useState(0);
 
   useEffect(() => {
     const fetchFollowedStreamers = async () => {
       if (!user) return;
 
       try {
-        const followedUsersResponse = await api.get<FollowedUser[]>('/users/me/following', {
-          headers: { Authorization: `Bearer ${localStorage.getItem("token")}` }
-        });
-
-        const followedUsers = followedUsersResponse.data;
+        // the list is paginated; follow the cursor until the last page
+        const followedUsers: FollowedUser[] = [];
+        let cursor: string | undefined;
+        do {
+          const followedUsersResponse = await api.get<FollowedUser[]>('/users/me/following', {
+            headers: { Authorization: `Bearer ${localStorage.getItem("token")}` },
+            params: { limit: FOLLOWING_PAGE_SIZE, cursor }
+          });
+          followedUsers.push(...followedUsersResponse.data);
+          const nextCursor = followedUsersResponse.headers['x-next-cursor'];
+          cursor = nextCursor ? String(nextCursor) : undefined;
+        } while (cursor);
 
         const streamsWithLiveStatus = await Promise.all(
           followedUsers.map(async (followedUser) => {
@@ -86,7 +104,7 @@ export default function FollowedSidebar({ isExpanded, setIsExpanded }: SidebarPr
     };
 
     fetchFollowedStreamers();
-  }, [user]);
+  }, [user, refreshKey]);
 
   const getProfilePictureUrl = (profilePicture?: string) => {
     if (!profilePicture) return "/default-avatar.png";
@@ -154,6 +172,7 @@ export default function FollowedSidebar({ isExpanded, setIsExpanded }: SidebarPr
     <div className={`bg-sidebar bg-[var(--background)] border-2 flex flex-col h-full ${
       isExpanded ? 'w-80' : 'w-18'
     } transition-all duration-300`}>
+      {user && <GoLiveListener onStreamLive={() => setRefreshKey(key => key + 1)} />}
       
       {/* Header */}
       <div className={`py-3 flex items-center ${ isExpanded ? 'border-b justify-between px-2' : 'justify-center' }`}>
@@ -0,0 +1,17 @@
+// hooks/useNotifications.ts
+import { useWebSocket } from './useWebSocket';
+import { WEBSOCKET_URL } from '../api';
+import type { Stream } from '../types/StreamTypes';
+
+export function useNotifications(onStreamLive: (stream: Stream) => void) {
+  const { isConnected } = useWebSocket(
+    `${WEBSOCKET_URL}/ws/notifications?token=${localStorage.getItem("token")}`,
+    (message) => {
+      if (message.type === 'stream_live') {
+        onStreamLive(message.data);
+      }
+    }
+  );
+
+  return { isConnected };
+}
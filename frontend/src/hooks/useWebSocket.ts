@@ -7,36 +7,66 @@ interface WebSocketMessage {
   data: any;
 }
 
-export function useWebSocket(url: string, onMessage: (message: WebSocketMessage) => void) {
+interface WebSocketOptions {
+  // url to use when reconnecting, e.g. with resume params appended
+  reconnectUrl?: () => string;
+}
+
+const DEFAULT_RECONNECT_DELAY = 3000;
+// service restart / going away: the server closes sockets before it can send
+// a reconnect hint, so clients spread themselves out over the same range
+const RESTART_CLOSE_CODES = new Set([1001, 1012]);
+const RESTART_RECONNECT_MIN = 1000;
+const RESTART_RECONNECT_MAX = 15000;
+
+export function useWebSocket(url: string, onMessage: (message: WebSocketMessage) => void, options: WebSocketOptions = {}) {
   const [isConnected, setIsConnected] = useState(false);
   const ws = useRef<WebSocket | null>(null);
   const reconnectTimeout = useRef<number | null>(null);
+  const reconnectDelay = useRef(DEFAULT_RECONNECT_DELAY);
+  const hinted = useRef(false);
 
-  const connect = () => {
+  const connect = (target: string = url) => {
     try {
-      ws.current = new WebSocket(url);
+      ws.current = new WebSocket(target);
       
       ws.current.onopen = () => {
         // console.log('WebSocket connected');
         setIsConnected(true);
+        reconnectDelay.current = DEFAULT_RECONNECT_DELAY;
+        hinted.current = false;
       };
 
       ws.current.onmessage = (event) => {
         try {
           const message: WebSocketMessage = JSON.parse(event.data);
+          if (message.type === 'ping') {
+            ws.current?.send(JSON.stringify({ type: 'pong' }));
+            return;
+          }
+          if (message.type === 'reconnect') {
+            reconnectDelay.current = message.data.delay_ms;
+            hinted.current = true;
+            return;
+          }
           onMessage(message);
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
         }
       };
 
-      ws.current.onclose = () => {
+      ws.current.onclose = (event) => {
         // console.log('WebSocket disconnected');
         setIsConnected(false);
+
+        let delay = reconnectDelay.current;
+        if (!hinted.current && RESTART_CLOSE_CODES.has(event.code)) {
+          delay = RESTART_RECONNECT_MIN + Math.random() * (RESTART_RECONNECT_MAX - RESTART_RECONNECT_MIN);
+        }
         
         reconnectTimeout.current = window.setTimeout(() => {
-          connect();
-        }, 3000);
+          connect(options.reconnectUrl ? options.reconnectUrl() : url);
+        }, delay);
       };
 
       ws.current.onerror = (error) => {
@@ -5,14 +5,30 @@ export interface ChatMessage {
   userId: number;
   username: string;
   message: string;
+  emotes?: [number, number][];
   timestamp: Date;
   isStreamer?: boolean;
 }
 
+export interface ChatMessageData {
+  id: number;
+  user_id: number;
+  username: string;
+  message: string;
+  emotes?: [number, number][];
+  timestamp: string;
+}
+
+export interface ChatErrorData {
+  code: 'user_rate_limited' | 'stream_rate_limited' | 'slow_mode' | 'blocked_term';
+  retry_after?: number;
+}
+
 export interface ChatResponse {
   id: number;
   user: User;
   message: string;
+  emotes?: [number, number][];
   timestamp: Date;
   isStreamer?: boolean;
 }
@@ -22,3 +38,8 @@ export interface ChatProps {
   streamerId: number;
   isAuthenticated: boolean;
 }
+
+export interface EmoteCatalog {
+  version: string;
+  emotes: Record<string, string>;
+}